@@ -1,19 +1,23 @@
 from fastapi import Header, HTTPException, status
 from typing import Optional
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import hmac
+from config import settings
 
 # Simple API key authentication
 # In production, use a more robust authentication system (JWT, OAuth2, etc.)
-API_KEY = os.getenv("API_KEY")
+API_KEY = settings.api_key
 
 # Warning if API key is not configured (but don't crash)
 if not API_KEY:
     print("⚠️  Warning: API_KEY environment variable is not set. API authentication is disabled.")
     API_KEY = "development-key-please-change"  # Fallback for development
 
+# Encode once so each request only pays for a single constant-time compare
+_API_KEY_BYTES = API_KEY.encode("utf-8")
+
+# Kept as a coroutine: it never awaits, so FastAPI runs it inline in the request
+# task (sync dependencies are dispatched to the threadpool instead), and the
+# result is already cached per request across sub-dependencies.
 async def verify_api_key(x_api_key: Optional[str] = Header(None, description="API Key for authentication")):
     """
     Dependency to verify API key authentication.
@@ -26,7 +30,7 @@ async def verify_api_key(x_api_key: Optional[str] = Header(None, description="AP
             headers={"WWW-Authenticate": "ApiKey"},
         )
     
-    if x_api_key != API_KEY:
+    if not hmac.compare_digest(x_api_key.encode("utf-8"), _API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API Key",
@@ -0,0 +1,26 @@
+"""
+Optional shared Redis connection for result caches.
+
+Each uvicorn worker has its own memory, so in-process caches are duplicated
+per worker. When REDIS_URL is set, caches that should be shared across
+workers go through this client instead.
+"""
+
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+redis_client: Optional[Redis] = (
+    Redis.from_url(settings.redis_url, decode_responses=False, max_connections=50)
+    if settings.redis_url else None
+)
+
+
+async def close_redis():
+    if redis_client is not None:
+        await redis_client.aclose()
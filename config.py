@@ -0,0 +1,26 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional
+
+
+class Settings(BaseSettings):
+    """Application settings, read once from the environment and .env file"""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
+
+    api_key: Optional[str] = None
+    database_url: str = "sqlite:///./chefcode.db"
+    # Comma-separated list, or "*" to allow every origin
+    allowed_origins: str = "*"
+    environment: str = "development"
+    port: int = 8000
+    # Uvicorn worker processes when running main.py outside development
+    web_concurrency: int = 1
+    # Shared cache across workers; in-process caches are used when unset
+    redis_url: Optional[str] = None
+
+    @property
+    def allowed_origins_list(self) -> List[str]:
+        return self.allowed_origins.split(",")
+
+
+settings = Settings()
@@ -0,0 +1,73 @@
+"""
+Global data version used as the ETag for the read-everything endpoints.
+
+Every commit that writes inventory, recipes or tasks bumps a counter row in
+the same transaction, so a GET can answer 304 after one primary-key lookup
+instead of loading and serializing the tables.
+"""
+
+from itertools import chain
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import DataVersion, InventoryItem, Recipe, Task
+
+TRACKED_MODELS = (InventoryItem, Recipe, Task)
+TRACKED_TABLES = frozenset(model.__tablename__ for model in TRACKED_MODELS)
+
+CURRENT_VERSION = select(DataVersion.version).where(DataVersion.id == 1)
+BUMP_VERSION = update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+
+
+@event.listens_for(Session, "after_flush")
+def track_flushed_changes(session, flush_context):
+    if any(isinstance(obj, TRACKED_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_statement_changes(orm_execute_state):
+    # Bulk INSERT/UPDATE and DELETE statements bypass the flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is None or table.name not in TRACKED_TABLES:
+        return None
+    if orm_execute_state.is_insert:
+        orm_execute_state.session.info["data_changed"] = True
+        return None
+
+    # UPDATE/DELETE that matched nothing (e.g. a no-op resync) leaves the version alone
+    result = orm_execute_state.invoke_statement()
+    if getattr(result, "rowcount", -1) != 0:
+        orm_execute_state.session.info["data_changed"] = True
+    return result
+
+
+@event.listens_for(Session, "before_commit")
+def bump_version(session):
+    # Pending objects are only flushed after this hook, so flush here to see them
+    session.flush()
+    if session.info.pop("data_changed", False):
+        if session.execute(BUMP_VERSION).rowcount == 0:
+            session.execute(insert(DataVersion).values(id=1, version=1))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changes(session):
+    session.info.pop("data_changed", None)
+
+
+def make_etag(version: Optional[int]) -> str:
+    return f'"v{version or 0}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
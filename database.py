@@ -1,18 +1,61 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from config import settings
 
 # Get database URL from environment or use SQLite as fallback
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chefcode.db")
+DATABASE_URL = settings.database_url
 
 # SQLite specific settings
 connect_args = {}
+engine_options = {}
 if DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
+else:
+    # Server databases: size the pool for threadpool bursts and drop stale connections
+    engine_options = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Room for every prebuilt route statement plus the ORM's own, so compiled SQL is never evicted
+engine = create_engine(DATABASE_URL, connect_args=connect_args, query_cache_size=1200, **engine_options)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async engine on the same database for handlers that await their queries instead of using the threadpool
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+_url = make_url(DATABASE_URL)
+async_engine = create_async_engine(
+    _url.set(drivername=ASYNC_DRIVERS.get(_url.get_backend_name(), _url.drivername)),
+    query_cache_size=1200,
+    **engine_options
+)
 
-Base = declarative_base()
\ No newline at end of file
+if DATABASE_URL.startswith("sqlite"):
+    # WAL lets readers run alongside the sync-data writer; NORMAL sync avoids an fsync per commit
+    SQLITE_PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+# Objects stay loaded after commit so handlers can return them without a reload SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
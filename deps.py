@@ -0,0 +1,52 @@
+from typing import Annotated, Any, Callable, Coroutine
+
+import orjson
+from fastapi import Depends, Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import AsyncSessionLocal, SessionLocal
+
+
+# Dependency to get database session (shared by every router)
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+DBSession = Annotated[Session, Depends(get_db)]
+
+
+# Async session for handlers that also await network calls, so queries don't block the event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+AsyncDBSession = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+class ORJSONRequest(Request):
+    """Request whose JSON body is parsed with orjson instead of the stdlib json module"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so FastAPI still answers 422
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class ORJSONRoute(APIRoute):
+    """Route class for routers that receive large JSON bodies"""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def orjson_route_handler(request: Request) -> Response:
+            return await handler(ORJSONRequest(request.scope, request.receive))
+
+        return orjson_route_handler
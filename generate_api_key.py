@@ -4,12 +4,12 @@ Generate a secure API key for ChefCode backend
 """
 import secrets
 
-def generate_api_key(length=32):
-    """Generate a secure random API key"""
-    return secrets.token_urlsafe(length)
+# Keep key generation on secrets.token_urlsafe / token_hex: each is a single call
+# into os.urandom plus a C encoder, whereas joining secrets.choice() per character
+# is an order of magnitude slower for the same entropy.
 
 if __name__ == "__main__":
-    api_key = generate_api_key()
+    api_key = secrets.token_urlsafe(32)
     print("=" * 60)
     print("Generated Secure API Key:")
     print("=" * 60)
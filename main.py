@@ -1,30 +1,54 @@
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import uvicorn
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
-import os
 
-# Load environment variables from .env file
+# Load environment variables from .env file (routers still read service keys via os.getenv)
 load_dotenv()
 
-from database import SessionLocal, engine
+from config import settings
+from cache import close_redis
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+from database import engine
 import models
 from routes import inventory, recipes, tasks, chat, data, actions, web_recipes, ai_assistant, ocr_invoice
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Bump when models gain tables or indexes so existing databases get them on next startup
+CURRENT_SCHEMA_VERSION = 4
+
+logger = logging.getLogger(__name__)
+
+# Recipe columns stored as JSON text before they became JSON columns
+RECIPE_JSON_COLUMNS = ("items", "ingredients_raw", "ingredients_mapped")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run startup work for the app and its routers, then release their clients on shutdown"""
+    ensure_schema()
+    await chat.start_batch_worker()
+    await ocr_invoice.warm_ocr_processor()
+    yield
+    await chat.close_http_client()
+    await web_recipes.close_mealdb_client()
+    await close_redis()
 
 app = FastAPI(
     title="ChefCode Backend",
     description="FastAPI backend for ChefCode inventory management system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS configuration to allow frontend connections
 # In production, replace with specific frontend URLs
 # Allow all origins for development (includes file:// protocol and localhost)
-ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",") if os.getenv("ALLOWED_ORIGINS") != "*" else ["*"]
+ALLOWED_ORIGINS = settings.allowed_origins_list
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,15 +56,69 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers only let scripts read response headers listed here
+    expose_headers=["ETag", "X-Next-After-Id"],
+)
+
+def upgrade_recipe_json_columns(conn):
+    """Convert legacy JSON-text recipe columns so the JSON column type can read them"""
+    if conn.dialect.name == "postgresql":
+        # Existing TEXT columns become JSONB; a no-op once converted
+        text_columns = conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'recipes' AND data_type = 'text' AND column_name = ANY(:names)"
+        ), {"names": list(RECIPE_JSON_COLUMNS)}).scalars().all()
+        for column in text_columns:
+            conn.exec_driver_sql(f"ALTER TABLE recipes ALTER COLUMN {column} TYPE JSONB USING NULLIF({column}, '')::jsonb")
+        return
+    
+    # SQLite keeps the JSON as text; only blank strings (not valid JSON) need clearing
+    existing_columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(recipes)")}
+    for column in RECIPE_JSON_COLUMNS:
+        if column in existing_columns:
+            conn.exec_driver_sql(f"UPDATE recipes SET {column} = NULL WHERE {column} = ''")
+
+def create_missing_indexes(conn):
+    """create_all skips tables that already exist, so add indexes declared on them since"""
+    # IF NOT EXISTS rather than checkfirst: reflection can't see expression indexes like lower(name)
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+# PostgreSQL GIN trigram indexes, so name searches with a leading wildcard avoid a table scan
+TRIGRAM_INDEXES = (
+    ("ix_inventory_items_name_trgm", "inventory_items", "name"),
+    ("ix_recipes_name_trgm", "recipes", "name"),
+    ("ix_recipes_cuisine_trgm", "recipes", "cuisine"),
 )
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
+def create_trigram_indexes(conn):
+    """Index names for ILIKE '%...%' searches; skipped if the pg_trgm extension can't be enabled"""
     try:
-        yield db
-    finally:
-        db.close()
+        with conn.begin_nested():
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for index_name, table, column in TRIGRAM_INDEXES:
+                conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin ({column} gin_trgm_ops)")
+    except DBAPIError as e:
+        logger.warning(f"pg_trgm unavailable, name searches will scan: {e}")
+
+def ensure_schema():
+    """Create database tables, skipping the reflection pass when the schema is current"""
+    if engine.dialect.name != "sqlite":
+        models.Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            upgrade_recipe_json_columns(conn)
+            create_missing_indexes(conn)
+            create_trigram_indexes(conn)
+        return
+    
+    with engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if version < CURRENT_SCHEMA_VERSION:
+            models.Base.metadata.create_all(bind=conn)
+            upgrade_recipe_json_columns(conn)
+            create_missing_indexes(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {CURRENT_SCHEMA_VERSION}")
 
 # Include routers
 app.include_router(inventory.router, prefix="/api", tags=["inventory"])
@@ -64,6 +142,17 @@ async def health_check():
 if __name__ == "__main__":
     # Use reload=True only in development
     # For production, use: uvicorn main:app --host 0.0.0.0 --port $PORT
-    is_dev = os.getenv("ENVIRONMENT", "development") == "development"
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=is_dev)
\ No newline at end of file
+    import uvicorn
+
+    is_dev = settings.environment == "development"
+    port = settings.port
+    # httptools ships with uvicorn[standard]; "auto" picks uvloop where it is available (not on Windows)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=is_dev,
+        loop="auto",
+        http="httptools",
+        workers=None if is_dev else settings.web_concurrency,
+    )
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Database Migration: bring an existing SQLite database up to the current schema
+Adds the HACCP, recipe yield and web recipe columns in a single transaction
+Run this script once after upgrading; it is safe to run again
+"""
+
+import sqlite3
+from pathlib import Path
+
+from migrate_utils import add_column_if_missing
+
+# Database path
+DB_PATH = Path(__file__).parent / "chefcode.db"
+
+# Columns added since the initial schema, per table
+COLUMNS_TO_ADD = {
+    "inventory_items": [
+        ("lot_number", "TEXT"),
+        ("expiry_date", "DATE"),
+    ],
+    "recipes": [
+        ("yield_data", "TEXT"),
+        ("source_url", "TEXT"),
+        ("image_url", "TEXT"),
+        ("cuisine", "TEXT"),
+        ("ingredients_raw", "TEXT"),
+        ("ingredients_mapped", "TEXT"),
+    ],
+}
+
+
+def migrate():
+    """Apply every pending column addition inside one transaction"""
+
+    if not DB_PATH.exists():
+        print(f"[ERROR] Database not found at {DB_PATH}")
+        print("   Run the main application first to create the database.")
+        return False
+
+    # Autocommit mode so BEGIN/COMMIT below are the only transaction boundaries
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("BEGIN")
+
+        added_count = 0
+        for table, columns in COLUMNS_TO_ADD.items():
+            for col_name, col_type in columns:
+                if add_column_if_missing(cursor, table, col_name, col_type):
+                    print(f"   [OK] Added column: {table}.{col_name}")
+                    added_count += 1
+                else:
+                    print(f"   [SKIP] Column already exists: {table}.{col_name}")
+
+        cursor.execute("COMMIT")
+
+        if added_count > 0:
+            print(f"\n[SUCCESS] Migration completed successfully! Added {added_count} column(s).")
+        else:
+            print(f"\n[SUCCESS] Migration completed - no changes needed (all columns already exist).")
+
+        return True
+
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        print(f"\n[ERROR] Migration failed: {e}")
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    print("=" * 70)
+    print("DATABASE MIGRATION")
+    print("=" * 70)
+    print()
+
+    success = migrate()
+
+    print()
+    if not success:
+        print("[WARNING] Migration failed. Please check the errors above.")
+    print()
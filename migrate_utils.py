@@ -0,0 +1,20 @@
+"""
+Shared helpers for the SQLite migration scripts
+"""
+
+import sqlite3
+
+
+def add_column_if_missing(cursor, table: str, name: str, col_type: str) -> bool:
+    """
+    Add a column to a table, tolerating columns that already exist.
+    Returns True if the column was added, False if it was already there.
+    """
+    # SQLite has no ADD COLUMN IF NOT EXISTS; the duplicate error is cheaper than reflecting the schema
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+        return True
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e):
+            raise
+        return False
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, Date
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, Date, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from database import Base
 from datetime import datetime, date
 
+# Parsed by the driver/SQLAlchemy on read; JSONB on PostgreSQL, JSON text elsewhere
+JSONColumn = JSON().with_variant(JSONB(), "postgresql")
+
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
     
@@ -18,20 +22,23 @@ class InventoryItem(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Serves case-insensitive exact name lookups
+    __table_args__ = (Index("ix_inventory_items_name_lower", func.lower(name)),)
+
 class Recipe(Base):
     __tablename__ = "recipes"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False, unique=True)
-    items = Column(Text)  # JSON string of recipe items
+    items = Column(JSONColumn)  # List of recipe items
     instructions = Column(Text, default="")
     yield_data = Column(Text, nullable=True)  # JSON string of yield info: {"qty": 10, "unit": "pz"}
     # Web recipe metadata
     source_url = Column(String, nullable=True)  # Original recipe URL (e.g., TheMealDB)
     image_url = Column(String, nullable=True)  # Recipe thumbnail/image URL
     cuisine = Column(String, nullable=True)  # Cuisine type (Italian, Chinese, etc.)
-    ingredients_raw = Column(Text, nullable=True)  # JSON: Original ingredients from web
-    ingredients_mapped = Column(Text, nullable=True)  # JSON: AI-mapped ingredients to inventory
+    ingredients_raw = Column(JSONColumn, nullable=True)  # Original ingredients from web
+    ingredients_mapped = Column(JSONColumn, nullable=True)  # AI-mapped ingredients to inventory
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -52,4 +59,10 @@ class SyncData(Base):
     id = Column(Integer, primary_key=True, index=True)
     data_type = Column(String, nullable=False)  # 'full_sync', 'inventory', 'recipes', 'tasks'
     data_content = Column(Text)  # JSON string of synced data
-    synced_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DataVersion(Base):
+    __tablename__ = "data_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # Bumped by every commit touching inventory, recipes or tasks
@@ -1,21 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy import bindparam, delete, insert, select, update
 from database import SessionLocal
+from deps import DBSession
 from models import InventoryItem, Recipe, Task, SyncData
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import Dict, Any, List
-import json
-from datetime import datetime, date
+import orjson
+from datetime import date, datetime
 from auth import verify_api_key
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Statements built once so SQLAlchemy's compiled cache is hit on every request
+INV_BY_NAME = select(InventoryItem).where(InventoryItem.name == bindparam("name")).limit(1)
+INV_BY_NAMES = select(InventoryItem).where(InventoryItem.name.in_(bindparam("names", expanding=True)))
+RECIPE_BY_NAME = select(Recipe).where(Recipe.name == bindparam("name")).limit(1)
+RECIPE_ROWS_BY_NAMES = select(Recipe.id, Recipe.name, Recipe.items, Recipe.yield_data).where(Recipe.name.in_(bindparam("names", expanding=True)))
+RECIPE_IDS_AND_NAMES = select(Recipe.id, Recipe.name)
+RECIPE_DELETE_BY_IDS = delete(Recipe).where(Recipe.id.in_(bindparam("ids", expanding=True))).execution_options(synchronize_session=False)
+TASK_ROWS_BY_IDS = select(Task.id, Task.recipe, Task.quantity, Task.assigned_to, Task.status).where(Task.id.in_(bindparam("ids", expanding=True)))
+
+# Large IN lists degrade SQLite's planner and can exceed its bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+def execute_in_chunks(db, stmt, param: str, values: List[Any]) -> List[Any]:
+    """Run an expanding-IN statement over the values in fixed-size chunks and merge the rows"""
+    rows = []
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        rows.extend(db.execute(stmt, {param: values[start:start + IN_CHUNK_SIZE]}).all())
+    return rows
 
 def parse_date_string(date_str):
     """Convert date string to date object"""
@@ -24,10 +40,42 @@ def parse_date_string(date_str):
     if isinstance(date_str, date):
         return date_str
     try:
+        # fromisoformat is a C builtin; slicing also accepts full ISO datetimes
+        return date.fromisoformat(date_str[:10])
+    except TypeError:
+        return None
+    except ValueError:
+        pass
+    try:
+        # strptime also accepts dates without zero padding, e.g. "2024-1-5"
         return datetime.strptime(date_str, '%Y-%m-%d').date()
-    except (ValueError, TypeError):
+    except ValueError:
         return None
 
+def bulk_write(db, stmt, rows: List[Dict[str, Any]]):
+    """ORM bulk INSERT, or UPDATE by primary key, in one executemany; no-op for an empty list"""
+    if rows:
+        db.execute(stmt, rows)
+
+def has_changes(existing, values: Dict[str, Any]) -> bool:
+    """True if any of the given column values differ from the stored row"""
+    return any(getattr(existing, key) != value for key, value in values.items())
+
+def persist_sync_backup(payload: Dict[str, Any]):
+    """Store the raw sync payload for recovery, after the response has been sent"""
+    db = SessionLocal()
+    try:
+        db.add(SyncData(
+            data_type="full_sync",
+            data_content=orjson.dumps(payload).decode()
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Sync backup failed: {type(e).__name__} - {str(e)}")
+    finally:
+        db.close()
+
 class ActionRequest(BaseModel):
     action: str
     data: Dict[Any, Any]
@@ -37,224 +85,238 @@ class SyncDataRequest(BaseModel):
     recipes: Dict[str, Dict[str, Any]]
     tasks: List[Dict[str, Any]]
 
-@router.post("/action")
-async def handle_action(
-    request: ActionRequest, 
-    db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
-):
-    """Handle various actions from frontend - matches original backend format"""
+def add_inventory(item_data: Dict[Any, Any], db) -> Dict[str, Any]:
+    """Add an inventory item, merging quantities with a matching entry"""
+    if "name" not in item_data:
+        raise HTTPException(status_code=400, detail="Missing required field: name")
     
-    action = request.action
-    data = request.data
+    # Check if item exists and merge if same price
+    existing_item = db.scalars(INV_BY_NAME, {"name": item_data["name"]}).first()
     
-    if action == "add-inventory":
-        # Add inventory item - validate required fields
-        item_data = data
-        
-        if "name" not in item_data:
-            raise HTTPException(status_code=400, detail="Missing required field: name")
-        
-        # Check if item exists and merge if same price
-        existing_item = db.query(InventoryItem).filter(InventoryItem.name == item_data["name"]).first()
+    if existing_item and abs(existing_item.price - item_data.get("price", 0)) < 0.01:
+        # Merge quantities for same item at same price (only if HACCP fields match)
+        existing_lot = existing_item.lot_number or ""
+        existing_expiry = existing_item.expiry_date
+        new_lot = item_data.get("lot_number") or ""
+        new_expiry = parse_date_string(item_data.get("expiry_date"))
         
-        if existing_item and abs(existing_item.price - item_data.get("price", 0)) < 0.01:
-            # Merge quantities for same item at same price (only if HACCP fields match)
-            existing_lot = existing_item.lot_number or ""
-            existing_expiry = existing_item.expiry_date
-            new_lot = item_data.get("lot_number") or ""
-            new_expiry = parse_date_string(item_data.get("expiry_date"))
-            
-            if existing_lot == new_lot and existing_expiry == new_expiry:
-                existing_item.quantity += item_data.get("quantity", 0)
-                db.commit()
-                return {"success": True, "message": "Item quantity updated"}
-            else:
-                # HACCP fields differ - create separate item for traceability
-                new_item = InventoryItem(
-                    name=item_data["name"],
-                    unit=item_data.get("unit", "pz"),
-                    quantity=item_data.get("quantity", 0),
-                    category=item_data.get("category", "Other"),
-                    price=item_data.get("price", 0),
-                    lot_number=item_data.get("lot_number"),
-                    expiry_date=parse_date_string(item_data.get("expiry_date"))
-                )
-                db.add(new_item)
-                db.commit()
-                return {"success": True, "message": "Item added (separate entry for HACCP traceability)"}
-        else:
-            # Create new item with HACCP fields
-            new_item = InventoryItem(
-                name=item_data["name"],
-                unit=item_data.get("unit", "pz"),
-                quantity=item_data.get("quantity", 0),
-                category=item_data.get("category", "Other"),
-                price=item_data.get("price", 0),
-                lot_number=item_data.get("lot_number"),
-                expiry_date=parse_date_string(item_data.get("expiry_date"))
-            )
-            db.add(new_item)
+        if existing_lot == new_lot and existing_expiry == new_expiry:
+            existing_item.quantity += item_data.get("quantity", 0)
             db.commit()
-            return {"success": True, "message": "Item added successfully"}
+            return {"success": True, "message": "Item quantity updated"}
+        message = "Item added (separate entry for HACCP traceability)"
+    else:
+        message = "Item added successfully"
     
-    elif action == "save-recipe":
-        # Save recipe - validate required fields
-        recipe_data = data
-        
-        if "name" not in recipe_data:
-            raise HTTPException(status_code=400, detail="Missing required field: name")
-        if "recipe" not in recipe_data:
-            raise HTTPException(status_code=400, detail="Missing required field: recipe")
-        
-        name = recipe_data["name"]
-        recipe_info = recipe_data["recipe"]
-        
-        # Check if recipe exists
-        existing_recipe = db.query(Recipe).filter(Recipe.name == name).first()
-        
-        items_json = json.dumps(recipe_info.get("items", []))
-        
-        if existing_recipe:
-            # Update existing recipe
-            existing_recipe.items = items_json
-            existing_recipe.instructions = recipe_info.get("instructions", "")
-            db.commit()
-            return {"success": True, "message": "Recipe updated successfully"}
-        else:
-            # Create new recipe
-            new_recipe = Recipe(
-                name=name,
-                items=items_json,
-                instructions=recipe_info.get("instructions", "")
-            )
-            db.add(new_recipe)
+    # New item, or HACCP fields differ - create separate item for traceability
+    new_item = InventoryItem(
+        name=item_data["name"],
+        unit=item_data.get("unit", "pz"),
+        quantity=item_data.get("quantity", 0),
+        category=item_data.get("category", "Other"),
+        price=item_data.get("price", 0),
+        lot_number=item_data.get("lot_number"),
+        expiry_date=parse_date_string(item_data.get("expiry_date"))
+    )
+    db.add(new_item)
+    db.commit()
+    return {"success": True, "message": message}
+
+def save_recipe(recipe_data: Dict[Any, Any], db) -> Dict[str, Any]:
+    """Create a recipe or update the existing one with the same name"""
+    if "name" not in recipe_data:
+        raise HTTPException(status_code=400, detail="Missing required field: name")
+    if "recipe" not in recipe_data:
+        raise HTTPException(status_code=400, detail="Missing required field: recipe")
+    
+    name = recipe_data["name"]
+    recipe_info = recipe_data["recipe"]
+    
+    # Check if recipe exists
+    existing_recipe = db.scalars(RECIPE_BY_NAME, {"name": name}).first()
+    
+    items = recipe_info.get("items", [])
+    instructions = recipe_info.get("instructions", "")
+    
+    if existing_recipe:
+        # Update existing recipe, skipping the UPDATE when the frontend re-saves it unchanged
+        if existing_recipe.items != items or existing_recipe.instructions != instructions:
+            existing_recipe.items = items
+            existing_recipe.instructions = instructions
             db.commit()
-            return {"success": True, "message": "Recipe saved successfully"}
+        return {"success": True, "message": "Recipe updated successfully"}
     
-    elif action == "add-task":
-        # Add task - validate required fields
-        task_data = data
-        
-        if "recipe" not in task_data:
-            raise HTTPException(status_code=400, detail="Missing required field: recipe")
-        
-        new_task = Task(
-            recipe=task_data["recipe"],
-            quantity=task_data.get("quantity", 1),
-            assigned_to=task_data.get("assignedTo", ""),
-            status=task_data.get("status", "todo")
-        )
-        db.add(new_task)
-        db.commit()
-        return {"success": True, "message": "Task added successfully"}
+    # Create new recipe
+    new_recipe = Recipe(
+        name=name,
+        items=items,
+        instructions=instructions
+    )
+    db.add(new_recipe)
+    db.commit()
+    return {"success": True, "message": "Recipe saved successfully"}
+
+def add_task(task_data: Dict[Any, Any], db) -> Dict[str, Any]:
+    """Add a production task"""
+    if "recipe" not in task_data:
+        raise HTTPException(status_code=400, detail="Missing required field: recipe")
     
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+    new_task = Task(
+        recipe=task_data["recipe"],
+        quantity=task_data.get("quantity", 1),
+        assigned_to=task_data.get("assignedTo", ""),
+        status=task_data.get("status", "todo")
+    )
+    db.add(new_task)
+    db.commit()
+    return {"success": True, "message": "Task added successfully"}
+
+# Action name -> handler; a new action only needs an entry here
+ACTION_HANDLERS = {
+    "add-inventory": add_inventory,
+    "save-recipe": save_recipe,
+    "add-task": add_task,
+}
+
+@router.post("/action")
+async def handle_action(
+    request: ActionRequest, 
+    db: DBSession,
+    api_key: str = Depends(verify_api_key)
+):
+    """Handle various actions from frontend - matches original backend format"""
+    
+    handler = ACTION_HANDLERS.get(request.action)
+    if handler is None:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
+    return handler(request.data, db)
+
+# The body is parsed by hand below, so its schema is declared for the OpenAPI docs
+SYNC_DATA_OPENAPI = {
+    "requestBody": {
+        "content": {"application/json": {"schema": SyncDataRequest.model_json_schema()}},
+        "required": True,
+    }
+}
 
-@router.post("/sync-data")
+@router.post("/sync-data", openapi_extra=SYNC_DATA_OPENAPI)
 async def sync_data(
-    request: SyncDataRequest, 
-    db: Session = Depends(get_db),
+    raw_request: Request,
+    db: DBSession,
+    background_tasks: BackgroundTasks,
     api_key: str = Depends(verify_api_key)
 ):
     """Sync all data from frontend - matches original backend format"""
     
+    # Parse and validate the (potentially large) payload in one pass inside pydantic-core
     try:
-        # Store sync data for backup
-        sync_record = SyncData(
-            data_type="full_sync",
-            data_content=json.dumps(request.dict())
-        )
-        db.add(sync_record)
-        
-        # Sync inventory - Fix N+1 query problem
+        request = SyncDataRequest.model_validate_json(await raw_request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+    
+    try:
+        # Sync inventory - one query to load, one bulk statement per write type
         if request.inventory:
             # Fetch all existing items in one query
             inventory_names = [item["name"] for item in request.inventory if "name" in item]
-            existing_items = db.query(InventoryItem).filter(InventoryItem.name.in_(inventory_names)).all()
-            existing_items_dict = {item.name: item for item in existing_items}
+            existing_items = execute_in_chunks(db, INV_BY_NAMES, "names", inventory_names)
+            existing_items_dict = {row.InventoryItem.name: row.InventoryItem for row in existing_items}
             
+            inventory_inserts = []
+            inventory_updates = []
             for item_data in request.inventory:
                 if "name" not in item_data:
                     continue
-                    
+                
+                values = {
+                    "unit": item_data.get("unit", "pz"),
+                    "quantity": item_data.get("quantity", 0),
+                    "category": item_data.get("category", "Other"),
+                    "price": item_data.get("price", 0),
+                    "lot_number": item_data.get("lot_number"),
+                    "expiry_date": parse_date_string(item_data.get("expiry_date"))
+                }
                 existing_item = existing_items_dict.get(item_data["name"])
                 if existing_item:
-                    # Update existing
-                    existing_item.unit = item_data.get("unit", "pz")
-                    existing_item.quantity = item_data.get("quantity", 0)
-                    existing_item.category = item_data.get("category", "Other")
-                    existing_item.price = item_data.get("price", 0)
-                    existing_item.lot_number = item_data.get("lot_number")
-                    existing_item.expiry_date = parse_date_string(item_data.get("expiry_date"))
+                    # Identical rows are skipped so a no-op resync writes nothing
+                    if has_changes(existing_item, values):
+                        values["id"] = existing_item.id
+                        inventory_updates.append(values)
                 else:
-                    # Create new - convert date string to date object
-                    item_data_copy = item_data.copy()
-                    item_data_copy['expiry_date'] = parse_date_string(item_data.get("expiry_date"))
-                    new_item = InventoryItem(**item_data_copy)
-                    db.add(new_item)
-        
-        # Sync recipes - Fix N+1 query problem and handle deletions
-        # Get all existing recipes from database
-        all_existing_recipes = db.query(Recipe).all()
-        existing_recipes_dict = {recipe.name: recipe for recipe in all_existing_recipes}
+                    values["name"] = item_data["name"]
+                    inventory_inserts.append(values)
+            
+            bulk_write(db, update(InventoryItem), inventory_updates)
+            bulk_write(db, insert(InventoryItem), inventory_inserts)
         
+        # Sync recipes - handle deletions by id, in chunks
         # Get recipe names from frontend
-        frontend_recipe_names = set(request.recipes.keys()) if request.recipes else set()
+        frontend_recipe_names = list(request.recipes.keys()) if request.recipes else []
         
-        # Delete recipes that exist in DB but not in frontend
-        for db_recipe in all_existing_recipes:
-            if db_recipe.name not in frontend_recipe_names:
-                db.delete(db_recipe)
+        # Delete recipes that exist in DB but not in frontend; binding every frontend
+        # name into one NOT IN list would hit the bound-parameter limit on large catalogues
+        keep_names = set(frontend_recipe_names)
+        stale_ids = [row.id for row in db.execute(RECIPE_IDS_AND_NAMES) if row.name not in keep_names]
+        for start in range(0, len(stale_ids), IN_CHUNK_SIZE):
+            db.execute(RECIPE_DELETE_BY_IDS, {"ids": stale_ids[start:start + IN_CHUNK_SIZE]})
         
         # Add or update recipes from frontend
         if request.recipes:
+            existing_recipes = execute_in_chunks(db, RECIPE_ROWS_BY_NAMES, "names", frontend_recipe_names)
+            existing_recipes_dict = {recipe.name: recipe for recipe in existing_recipes}
+            
+            recipe_inserts = []
+            recipe_updates = []
             for recipe_name, recipe_data in request.recipes.items():
-                existing_recipe = existing_recipes_dict.get(recipe_name)
-                items_json = json.dumps(recipe_data.get("items", []))
-                yield_json = json.dumps(recipe_data.get("yield")) if recipe_data.get("yield") else None
+                yield_json = orjson.dumps(recipe_data.get("yield")).decode() if recipe_data.get("yield") else None
                 
+                values = {"items": recipe_data.get("items", []), "yield_data": yield_json}
+                existing_recipe = existing_recipes_dict.get(recipe_name)
                 if existing_recipe:
-                    existing_recipe.items = items_json
-                    existing_recipe.yield_data = yield_json
+                    if has_changes(existing_recipe, values):
+                        values["id"] = existing_recipe.id
+                        recipe_updates.append(values)
                 else:
-                    new_recipe = Recipe(
-                        name=recipe_name,
-                        items=items_json,
-                        yield_data=yield_json
-                    )
-                    db.add(new_recipe)
+                    values["name"] = recipe_name
+                    recipe_inserts.append(values)
+            
+            bulk_write(db, update(Recipe), recipe_updates)
+            bulk_write(db, insert(Recipe), recipe_inserts)
         
-        # Sync tasks - Fix N+1 query problem
+        # Sync tasks - one query to load, one bulk statement per write type
         if request.tasks:
             task_ids = [task_data["id"] for task_data in request.tasks if "id" in task_data]
-            existing_tasks = db.query(Task).filter(Task.id.in_(task_ids)).all() if task_ids else []
+            existing_tasks = execute_in_chunks(db, TASK_ROWS_BY_IDS, "ids", task_ids)
             existing_tasks_dict = {task.id: task for task in existing_tasks}
             
+            task_inserts = []
+            task_updates = []
             for task_data in request.tasks:
                 if "recipe" not in task_data:
                     continue
-                    
-                if "id" in task_data:
-                    existing_task = existing_tasks_dict.get(task_data["id"])
-                    if existing_task:
-                        existing_task.recipe = task_data["recipe"]
-                        existing_task.quantity = task_data.get("quantity", 1)
-                        existing_task.assigned_to = task_data.get("assignedTo", "")
-                        existing_task.status = task_data.get("status", "todo")
-                        continue
                 
-                # Create new task
-                new_task = Task(
-                    recipe=task_data["recipe"],
-                    quantity=task_data.get("quantity", 1),
-                    assigned_to=task_data.get("assignedTo", ""),
-                    status=task_data.get("status", "todo")
-                )
-                db.add(new_task)
+                values = {
+                    "recipe": task_data["recipe"],
+                    "quantity": task_data.get("quantity", 1),
+                    "assigned_to": task_data.get("assignedTo", ""),
+                    "status": task_data.get("status", "todo")
+                }
+                existing_task = existing_tasks_dict.get(task_data.get("id"))
+                if existing_task:
+                    if has_changes(existing_task, values):
+                        values["id"] = existing_task.id
+                        task_updates.append(values)
+                else:
+                    # Create new task
+                    task_inserts.append(values)
+            
+            bulk_write(db, update(Task), task_updates)
+            bulk_write(db, insert(Task), task_inserts)
         
         db.commit()
+        
+        # Store sync data for backup once the response is on its way
+        background_tasks.add_task(persist_sync_backup, request.model_dump())
         return {"success": True, "message": "Data synchronized successfully"}
         
     except Exception as e:
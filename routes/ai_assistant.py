@@ -3,34 +3,55 @@ AI Assistant API Routes
 Handles natural language commands for inventory and recipe management
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified
+from deps import AsyncDBSession, ORJSONRoute
 from models import Recipe, InventoryItem
 from services.ai_assistant_service import AIAssistantService
-from services.ai_service import AIService
-from services.mealdb_service import MealDBService
-import json
+from services.ai_service import get_ai_service
+from services.mealdb_service import get_mealdb_service
+import orjson
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
-
-# Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(route_class=ORJSONRoute)
 
 # Initialize services
 ai_assistant = AIAssistantService()
-ai_service = AIService()
-mealdb_service = MealDBService()
+ai_service = get_ai_service()
+mealdb_service = get_mealdb_service()
+
+
+# Statements built once so SQLAlchemy's compiled cache is hit on every request
+INVENTORY_BY_LOWER_NAME = select(InventoryItem).where(func.lower(InventoryItem.name) == bindparam("name")).limit(1)
+INVENTORY_BY_NAME_LIKE = select(InventoryItem).where(InventoryItem.name.ilike(bindparam("pattern"))).limit(1)
+INVENTORY_COUNT = select(func.count()).select_from(InventoryItem)
+# Handlers only reference the recipe or print it, so they select the columns they show
+RECIPE_REF_BY_NAME_LIKE = select(Recipe.id, Recipe.name).where(Recipe.name.ilike(bindparam("pattern"))).limit(1)
+RECIPE_VIEW_BY_NAME_LIKE = select(Recipe.id, Recipe.name, Recipe.items, Recipe.instructions).where(
+    Recipe.name.ilike(bindparam("pattern"))
+).limit(1)
+RECIPE_NAMES_BY_NAME_OR_CUISINE_LIKE = select(Recipe.name).where(
+    or_(Recipe.name.ilike(bindparam("pattern")), Recipe.cuisine.ilike(bindparam("pattern")))
+)
+# The catalogue reply lists the first few names and counts the rest
+CATALOGUE_PREVIEW_SIZE = 10
+RECIPE_COUNT = select(func.count()).select_from(Recipe)
+CATALOGUE_PREVIEW = select(Recipe.name).order_by(Recipe.id).limit(CATALOGUE_PREVIEW_SIZE)
+
+
+async def find_inventory_item(db: AsyncSession, name) -> Optional[InventoryItem]:
+    """Exact case-insensitive match through the lower(name) index, else the first substring match"""
+    item = await db.scalar(INVENTORY_BY_LOWER_NAME, {"name": str(name).lower()})
+    if item is None:
+        item = await db.scalar(INVENTORY_BY_NAME_LIKE, {"pattern": f"%{name}%"})
+    return item
 
 
 # ===== REQUEST/RESPONSE MODELS =====
@@ -52,6 +73,27 @@ class CommandResponse(BaseModel):
     search_results: Optional[List[Dict]] = None
 
 
+def command_response(
+    intent: str,
+    confidence: float,
+    message: str,
+    requires_confirmation: bool = False,
+    confirmation_data: Optional[Dict[str, Any]] = None,
+    action_result: Optional[Dict[str, Any]] = None,
+    search_results: Optional[List[Dict]] = None
+) -> Dict[str, Any]:
+    """Build a reply with CommandResponse's fields as a plain dict, serialized by orjson without validation"""
+    return {
+        "intent": intent,
+        "confidence": confidence,
+        "message": message,
+        "requires_confirmation": requires_confirmation,
+        "confirmation_data": confirmation_data,
+        "action_result": action_result,
+        "search_results": search_results,
+    }
+
+
 class ConfirmationRequest(BaseModel):
     """Request model for confirming an action"""
     confirmation_id: str
@@ -61,10 +103,10 @@ class ConfirmationRequest(BaseModel):
 
 # ===== MAIN COMMAND ENDPOINT =====
 
-@router.post("/command", response_model=CommandResponse)
+@router.post("/command", responses={200: {"model": CommandResponse}})
 async def process_command(
     request: CommandRequest,
-    db: Session = Depends(get_db)
+    db: AsyncDBSession
 ):
     """
     Process a natural language command from the user
@@ -80,46 +122,19 @@ async def process_command(
         logger.info(f"Detected intent: {intent_result.intent} (confidence: {intent_result.confidence})")
         
         # Route to appropriate handler
-        if intent_result.intent.startswith("add_inventory"):
-            return await handle_add_inventory(intent_result, db)
-        
-        elif intent_result.intent.startswith("update_inventory"):
-            return await handle_update_inventory(intent_result, db)
-        
-        elif intent_result.intent.startswith("delete_inventory"):
-            return await handle_delete_inventory(intent_result, db)
-        
-        elif intent_result.intent == "query_inventory":
-            return await handle_query_inventory(intent_result, db)
-        
-        elif intent_result.intent == "add_recipe":
-            return await handle_add_recipe(intent_result, request.command, db)
-        
-        elif intent_result.intent == "edit_recipe":
-            return await handle_edit_recipe(intent_result, request.command, db)
-        
-        elif intent_result.intent == "delete_recipe":
-            return await handle_delete_recipe(intent_result, db)
-        
-        elif intent_result.intent == "search_recipe_web":
-            return await handle_search_recipe_web(intent_result)
-        
-        elif intent_result.intent == "show_recipe":
-            return await handle_show_recipe(intent_result, db)
-        
-        elif intent_result.intent == "show_catalogue":
-            return handle_show_catalogue(db)
-        
-        elif intent_result.intent == "filter_catalogue":
-            return handle_filter_catalogue(intent_result, db)
+        intent = intent_result.intent
+        handler = EXACT_INTENT_HANDLERS.get(intent) or next(
+            (h for prefix, h in PREFIX_INTENT_HANDLERS if intent.startswith(prefix)), None
+        )
+        if handler is not None:
+            return ORJSONResponse(await handler(intent_result, request.command, db))
         
-        else:
-            return CommandResponse(
-                intent=intent_result.intent,
-                confidence=intent_result.confidence,
-                message=intent_result.response_message or "I'm not sure how to help with that. Try rephrasing?",
-                requires_confirmation=False
-            )
+        return ORJSONResponse(command_response(
+            intent=intent,
+            confidence=intent_result.confidence,
+            message=intent_result.response_message or "I'm not sure how to help with that. Try rephrasing?",
+            requires_confirmation=False
+        ))
             
     except Exception as e:
         logger.error(f"Command processing error: {str(e)}")
@@ -131,39 +146,18 @@ async def process_command(
 @router.post("/confirm")
 async def confirm_action(
     request: ConfirmationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncDBSession
 ):
     """Execute a confirmed action"""
     try:
         if not request.confirmed:
-            return {"message": "Action cancelled.", "success": False}
+            return ORJSONResponse({"message": "Action cancelled.", "success": False})
         
         # Execute based on intent stored in confirmation_data
-        intent = request.data.get("intent")
-        
-        if intent == "add_recipe":
-            return await execute_add_recipe(request.data, db)
-        
-        elif intent == "update_recipe_ingredients":
-            return await execute_update_recipe_ingredients(request.data, db)
-        
-        elif intent == "delete_recipe":
-            return await execute_delete_recipe(request.data, db)
-        
-        elif intent == "edit_recipe":
-            return await execute_edit_recipe(request.data, db)
-        
-        elif intent == "add_inventory":
-            return await execute_add_inventory(request.data, db)
-        
-        elif intent == "update_inventory":
-            return await execute_update_inventory(request.data, db)
-        
-        elif intent == "delete_inventory":
-            return await execute_delete_inventory(request.data, db)
-        
-        else:
-            return {"message": "Unknown action", "success": False}
+        executor = CONFIRM_EXECUTORS.get(request.data.get("intent"))
+        if executor is None:
+            return ORJSONResponse({"message": "Unknown action", "success": False})
+        return ORJSONResponse(await executor(request.data, db))
             
     except Exception as e:
         logger.error(f"Confirmation execution error: {str(e)}")
@@ -172,7 +166,7 @@ async def confirm_action(
 
 # ===== INVENTORY HANDLERS =====
 
-async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
+async def handle_add_inventory(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle add inventory intent with validation - checks if item exists first"""
     entities = intent_result.entities
     
@@ -189,7 +183,7 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
     # If any mandatory fields are missing, ask for them
     if missing_fields:
         fields_text = ', '.join(missing_fields)
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"📝 To add inventory, I need the {fields_text}. Please provide the missing information.\n\nExample: 'Add 5 kg of rice' or 'Add 10 liters of milk at 2.50 euros'",
@@ -201,9 +195,7 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
         )
     
     # Check if item already exists
-    existing_item = db.query(InventoryItem).filter(
-        InventoryItem.name.ilike(f"%{entities.get('item_name')}%")
-    ).first()
+    existing_item = await find_inventory_item(db, entities.get('item_name'))
     
     category = entities.get('category', 'Other')
     
@@ -214,7 +206,7 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
         if entities.get('price'):
             price_info = f" at €{entities.get('price')}/{entities.get('unit')}"
         
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"📦 '{existing_item.name}' already exists with {existing_item.quantity} {existing_item.unit}.\n\nAdd {entities.get('quantity')} {entities.get('unit')}{price_info}?\n(New total: {new_total} {entities.get('unit')})",
@@ -233,7 +225,7 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
     else:
         # New item - need price
         if not entities.get('price'):
-            return CommandResponse(
+            return command_response(
                 intent=intent_result.intent,
                 confidence=intent_result.confidence,
                 message=f"📝 '{entities.get('item_name')}' is a new item. Please provide the unit price.\n\nExample: 'Add {entities.get('quantity')} {entities.get('unit')} of {entities.get('item_name')} at 2.50 euros'",
@@ -244,7 +236,7 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
                 }
             )
         
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"➕ Add new item: {entities.get('quantity')} {entities.get('unit')} of {entities.get('item_name')} at €{entities.get('price')}/{entities.get('unit')}. Confirm?",
@@ -261,24 +253,22 @@ async def handle_add_inventory(intent_result, db: Session) -> CommandResponse:
         )
 
 
-async def handle_update_inventory(intent_result, db: Session) -> CommandResponse:
+async def handle_update_inventory(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle update inventory intent"""
     entities = intent_result.entities
     
     # Check if item exists
-    item = db.query(InventoryItem).filter(
-        InventoryItem.name.ilike(f"%{entities.get('item_name')}%")
-    ).first()
+    item = await find_inventory_item(db, entities.get('item_name'))
     
     if not item:
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Item '{entities.get('item_name')}' not found in inventory.",
             requires_confirmation=False
         )
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
         message=f"Update {item.name} from {item.quantity} {item.unit} to {entities.get('quantity')} {entities.get('unit')}?",
@@ -292,23 +282,21 @@ async def handle_update_inventory(intent_result, db: Session) -> CommandResponse
     )
 
 
-async def handle_delete_inventory(intent_result, db: Session) -> CommandResponse:
+async def handle_delete_inventory(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle delete inventory intent"""
     entities = intent_result.entities
     
-    item = db.query(InventoryItem).filter(
-        InventoryItem.name.ilike(f"%{entities.get('item_name')}%")
-    ).first()
+    item = await find_inventory_item(db, entities.get('item_name'))
     
     if not item:
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Item '{entities.get('item_name')}' not found.",
             requires_confirmation=False
         )
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
         message=f"⚠️ Delete {item.name} from inventory?",
@@ -320,15 +308,13 @@ async def handle_delete_inventory(intent_result, db: Session) -> CommandResponse
     )
 
 
-async def handle_query_inventory(intent_result, db: Session) -> CommandResponse:
+async def handle_query_inventory(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle inventory query intent"""
     entities = intent_result.entities
     item_name = entities.get('item_name')
     
     if item_name:
-        item = db.query(InventoryItem).filter(
-            InventoryItem.name.ilike(f"%{item_name}%")
-        ).first()
+        item = await find_inventory_item(db, item_name)
         
         if item:
             message = f"📦 {item.name}: {item.quantity} {item.unit}"
@@ -338,10 +324,10 @@ async def handle_query_inventory(intent_result, db: Session) -> CommandResponse:
             message = f"❌ '{item_name}' not found in inventory."
     else:
         # Show all inventory count
-        count = db.query(InventoryItem).count()
+        count = await db.scalar(INVENTORY_COUNT)
         message = f"📦 You have {count} items in inventory."
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
         message=message,
@@ -351,7 +337,7 @@ async def handle_query_inventory(intent_result, db: Session) -> CommandResponse:
 
 # ===== RECIPE HANDLERS =====
 
-async def handle_add_recipe(intent_result, full_command: str, db: Session) -> CommandResponse:
+async def handle_add_recipe(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle add recipe intent - parse and confirm with validation"""
     try:
         # Parse recipe from natural language
@@ -371,7 +357,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
             fields_text = ' and '.join(missing_fields)
             
             if 'ingredients' in missing_fields:
-                return CommandResponse(
+                return command_response(
                     intent=intent_result.intent,
                     confidence=intent_result.confidence,
                     message=f"📝 To add a recipe, I need the {fields_text}.\n\nPlease tell me the ingredients for this recipe.\n\nExample: 'flour 500 grams, tomato sauce 200 ml, and cheese 50 grams'",
@@ -382,7 +368,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
                     }
                 )
             else:
-                return CommandResponse(
+                return command_response(
                     intent=intent_result.intent,
                     confidence=intent_result.confidence,
                     message=f"📝 I need the {fields_text} to add the recipe.\n\nExample: 'Add recipe Pizza with flour 500 grams'",
@@ -390,7 +376,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
                 )
         
         # Check if recipe already exists
-        existing = db.query(Recipe).filter(Recipe.name.ilike(f"%{recipe_data['recipe_name']}%")).first()
+        existing = (await db.execute(RECIPE_REF_BY_NAME_LIKE, {"pattern": f"%{recipe_data['recipe_name']}%"})).first()
         
         if existing:
             # Recipe exists - offer to add ingredients or update
@@ -399,7 +385,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
                 for ing in recipe_data['ingredients']
             ])
             
-            return CommandResponse(
+            return command_response(
                 intent=intent_result.intent,
                 confidence=intent_result.confidence,
                 message=f"⚠️ Recipe '{existing.name}' already exists.\n\nDo you want to:\n1. Add/update these ingredients?\n{ingredients_list}\n\nSay 'yes' to update, or 'create new recipe' to make a different one.",
@@ -420,7 +406,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
         
         if missing_quantities:
             ingredients_text = ', '.join(missing_quantities)
-            return CommandResponse(
+            return command_response(
                 intent=intent_result.intent,
                 confidence=intent_result.confidence,
                 message=f"📝 Please provide quantities and units for: {ingredients_text}\n\nExample: 'flour 500 grams, salt 10 grams'",
@@ -440,7 +426,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
                 for ing in recipe_data['ingredients']
             ])
             
-            return CommandResponse(
+            return command_response(
                 intent=intent_result.intent,
                 confidence=intent_result.confidence,
                 message=f"📝 Recipe '{recipe_data['recipe_name']}' with:\n\n{ingredients_list}\n\n⚖️ What is the yield?\n\nExample: '10 servings' or '2 pizzas' or '5 liters'",
@@ -459,7 +445,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
         
         message = f"📝 Add recipe '{recipe_data['recipe_name']}'?\n\nIngredients:\n{ingredients_list}\n\nYield: {recipe_data['yield_qty']} {recipe_data['yield_unit']}"
         
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=message,
@@ -472,7 +458,7 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
         
     except Exception as e:
         logger.error(f"Recipe parsing error: {str(e)}")
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=0.0,
             message=f"❌ Could not parse recipe. Please provide the recipe name and ingredients.\n\nExample: 'Add recipe Pizza with flour 500 grams and tomato sauce 200 ml'",
@@ -480,15 +466,15 @@ async def handle_add_recipe(intent_result, full_command: str, db: Session) -> Co
         )
 
 
-async def handle_edit_recipe(intent_result, full_command: str, db: Session) -> CommandResponse:
+async def handle_edit_recipe(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle edit recipe intent - parse and execute the edit"""
     entities = intent_result.entities
     recipe_name = entities.get('recipe_name')
     
-    recipe = db.query(Recipe).filter(Recipe.name.ilike(f"%{recipe_name}%")).first()
+    recipe = (await db.execute(RECIPE_REF_BY_NAME_LIKE, {"pattern": f"%{recipe_name}%"})).first()
     
     if not recipe:
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Recipe '{recipe_name}' not found.",
@@ -516,7 +502,7 @@ async def handle_edit_recipe(intent_result, full_command: str, db: Session) -> C
         
         message += "\n\nConfirm?"
         
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=message,
@@ -533,7 +519,7 @@ async def handle_edit_recipe(intent_result, full_command: str, db: Session) -> C
         )
     else:
         # Not enough information
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"✏️ To edit '{recipe.name}', please specify:\n\nExamples:\n  • 'Add 2 grams of salt'\n  • 'Remove flour'\n  • 'Change tomatoes to 500 grams'",
@@ -541,22 +527,22 @@ async def handle_edit_recipe(intent_result, full_command: str, db: Session) -> C
         )
 
 
-async def handle_delete_recipe(intent_result, db: Session) -> CommandResponse:
+async def handle_delete_recipe(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle delete recipe intent"""
     entities = intent_result.entities
     recipe_name = entities.get('recipe_name')
     
-    recipe = db.query(Recipe).filter(Recipe.name.ilike(f"%{recipe_name}%")).first()
+    recipe = (await db.execute(RECIPE_REF_BY_NAME_LIKE, {"pattern": f"%{recipe_name}%"})).first()
     
     if not recipe:
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Recipe '{recipe_name}' not found.",
             requires_confirmation=False
         )
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
         message=f"⚠️ Delete recipe '{recipe.name}'? This cannot be undone.",
@@ -569,7 +555,7 @@ async def handle_delete_recipe(intent_result, db: Session) -> CommandResponse:
     )
 
 
-async def handle_search_recipe_web(intent_result) -> CommandResponse:
+async def handle_search_recipe_web(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle search recipe web intent - triggers existing web recipe modal"""
     entities = intent_result.entities
     query = entities.get('query', '')
@@ -577,7 +563,7 @@ async def handle_search_recipe_web(intent_result) -> CommandResponse:
     try:
         # Just return a success message with the query
         # The frontend will handle opening the existing web recipe search modal
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"🔍 Opening recipe search for '{query}'...",
@@ -588,7 +574,7 @@ async def handle_search_recipe_web(intent_result) -> CommandResponse:
         
     except Exception as e:
         logger.error(f"Recipe search error: {str(e)}")
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Search failed: {str(e)}",
@@ -596,15 +582,15 @@ async def handle_search_recipe_web(intent_result) -> CommandResponse:
         )
 
 
-async def handle_show_recipe(intent_result, db: Session) -> CommandResponse:
+async def handle_show_recipe(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle show recipe intent"""
     entities = intent_result.entities
     recipe_name = entities.get('recipe_name')
     
-    recipe = db.query(Recipe).filter(Recipe.name.ilike(f"%{recipe_name}%")).first()
+    recipe = (await db.execute(RECIPE_VIEW_BY_NAME_LIKE, {"pattern": f"%{recipe_name}%"})).first()
     
     if not recipe:
-        return CommandResponse(
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"❌ Recipe '{recipe_name}' not found.",
@@ -612,7 +598,7 @@ async def handle_show_recipe(intent_result, db: Session) -> CommandResponse:
         )
     
     # Parse items
-    items = json.loads(recipe.items) if recipe.items else []
+    items = recipe.items or []
     ingredients_list = "\n".join([
         f"  • {item['name']}: {item.get('quantity', '?')} {item.get('unit', '')}"
         for item in items
@@ -622,7 +608,7 @@ async def handle_show_recipe(intent_result, db: Session) -> CommandResponse:
     if recipe.instructions:
         message += f"\n\n{recipe.instructions[:200]}..."
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
         message=message,
@@ -631,57 +617,74 @@ async def handle_show_recipe(intent_result, db: Session) -> CommandResponse:
     )
 
 
-def handle_show_catalogue(db: Session) -> CommandResponse:
+async def handle_show_catalogue(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle show catalogue intent"""
-    recipes = db.query(Recipe).all()
+    total = await db.scalar(RECIPE_COUNT)
+    names = (await db.scalars(CATALOGUE_PREVIEW)).all()
     
-    recipe_list = "\n".join([f"  • {r.name}" for r in recipes[:10]])
-    message = f"📚 Recipe Catalogue ({len(recipes)} total):\n\n{recipe_list}"
+    recipe_list = "\n".join([f"  • {name}" for name in names])
+    message = f"📚 Recipe Catalogue ({total} total):\n\n{recipe_list}"
     
-    if len(recipes) > 10:
-        message += f"\n  ... and {len(recipes) - 10} more"
+    if total > CATALOGUE_PREVIEW_SIZE:
+        message += f"\n  ... and {total - CATALOGUE_PREVIEW_SIZE} more"
     
-    return CommandResponse(
+    return command_response(
         intent="show_catalogue",
         confidence=1.0,
         message=message,
         requires_confirmation=False,
-        action_result={"total_recipes": len(recipes)}
+        action_result={"total_recipes": total}
     )
 
 
-def handle_filter_catalogue(intent_result, db: Session) -> CommandResponse:
+async def handle_filter_catalogue(intent_result, full_command: str, db: AsyncSession) -> Dict[str, Any]:
     """Handle filter catalogue intent"""
     entities = intent_result.entities
     category = entities.get('category', '').lower()
     
     # Filter recipes (basic text search in name/cuisine)
-    recipes = db.query(Recipe).filter(
-        (Recipe.name.ilike(f"%{category}%")) | 
-        (Recipe.cuisine.ilike(f"%{category}%"))
-    ).all()
+    names = (await db.scalars(RECIPE_NAMES_BY_NAME_OR_CUISINE_LIKE, {"pattern": f"%{category}%"})).all()
     
-    if not recipes:
-        return CommandResponse(
+    if not names:
+        return command_response(
             intent=intent_result.intent,
             confidence=intent_result.confidence,
             message=f"No recipes found in category '{category}'.",
             requires_confirmation=False
         )
     
-    recipe_list = "\n".join([f"  • {r.name}" for r in recipes])
+    recipe_list = "\n".join([f"  • {name}" for name in names])
     
-    return CommandResponse(
+    return command_response(
         intent=intent_result.intent,
         confidence=intent_result.confidence,
-        message=f"📚 {category.title()} Recipes ({len(recipes)}):\n\n{recipe_list}",
+        message=f"📚 {category.title()} Recipes ({len(names)}):\n\n{recipe_list}",
         requires_confirmation=False
     )
 
 
+# Intent dispatch, built once; every handler takes (intent_result, full_command, db)
+EXACT_INTENT_HANDLERS = {
+    "query_inventory": handle_query_inventory,
+    "add_recipe": handle_add_recipe,
+    "edit_recipe": handle_edit_recipe,
+    "delete_recipe": handle_delete_recipe,
+    "search_recipe_web": handle_search_recipe_web,
+    "show_recipe": handle_show_recipe,
+    "show_catalogue": handle_show_catalogue,
+    "filter_catalogue": handle_filter_catalogue,
+}
+# Inventory intents are matched by prefix, as the model may return suffixed variants
+PREFIX_INTENT_HANDLERS = (
+    ("add_inventory", handle_add_inventory),
+    ("update_inventory", handle_update_inventory),
+    ("delete_inventory", handle_delete_inventory),
+)
+
+
 # ===== EXECUTION FUNCTIONS =====
 
-async def execute_add_recipe(data: Dict, db: Session) -> Dict:
+async def execute_add_recipe(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed recipe addition"""
     try:
         recipe_data = data['recipe_data']
@@ -709,13 +712,13 @@ async def execute_add_recipe(data: Dict, db: Session) -> Dict:
         
         new_recipe = Recipe(
             name=recipe_data['recipe_name'],
-            items=json.dumps(items),
+            items=items,
             instructions=recipe_data.get('instructions', ''),
-            yield_data=json.dumps(yield_data_dict)
+            yield_data=orjson.dumps(yield_data_dict).decode()
         )
         
         db.add(new_recipe)
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -723,20 +726,20 @@ async def execute_add_recipe(data: Dict, db: Session) -> Dict:
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Recipe add execution error: {str(e)}")
         return {"success": False, "message": f"❌ Failed to add recipe: {str(e)}"}
 
 
-async def execute_update_recipe_ingredients(data: Dict, db: Session) -> Dict:
+async def execute_update_recipe_ingredients(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed recipe ingredient update - adds or updates ingredients"""
     try:
-        recipe = db.query(Recipe).filter(Recipe.id == data['recipe_id']).first()
+        recipe = await db.get(Recipe, data['recipe_id'])
         if not recipe:
             return {"success": False, "message": "❌ Recipe not found"}
         
         # Parse current items
-        items = json.loads(recipe.items) if recipe.items else []
+        items = recipe.items or []
         
         # Track what we did
         added = []
@@ -770,8 +773,10 @@ async def execute_update_recipe_ingredients(data: Dict, db: Session) -> Dict:
                 added.append(f"{new_ing['name']}: {ing_qty} {ing_unit}")
         
         # Save updated recipe
-        recipe.items = json.dumps(items)
-        db.commit()
+        # Items are edited in place, so mark the JSON column dirty explicitly
+        recipe.items = items
+        flag_modified(recipe, "items")
+        await db.commit()
         
         # Build message
         message = f"✅ Updated recipe '{recipe.name}'\n"
@@ -783,21 +788,21 @@ async def execute_update_recipe_ingredients(data: Dict, db: Session) -> Dict:
         return {"success": True, "message": message}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Recipe update error: {str(e)}")
         return {"success": False, "message": f"❌ Failed to update recipe: {str(e)}"}
 
 
-async def execute_delete_recipe(data: Dict, db: Session) -> Dict:
+async def execute_delete_recipe(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed recipe deletion"""
     try:
-        recipe = db.query(Recipe).filter(Recipe.id == data['recipe_id']).first()
+        recipe = await db.get(Recipe, data['recipe_id'])
         if not recipe:
             return {"success": False, "message": "Recipe not found"}
         
         recipe_name = recipe.name
-        db.delete(recipe)
-        db.commit()
+        await db.delete(recipe)
+        await db.commit()
         
         return {
             "success": True,
@@ -805,20 +810,20 @@ async def execute_delete_recipe(data: Dict, db: Session) -> Dict:
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Recipe delete execution error: {str(e)}")
         return {"success": False, "message": f"❌ Failed to delete recipe: {str(e)}"}
 
 
-async def execute_edit_recipe(data: Dict, db: Session) -> Dict:
+async def execute_edit_recipe(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed recipe edit"""
     try:
-        recipe = db.query(Recipe).filter(Recipe.id == data['recipe_id']).first()
+        recipe = await db.get(Recipe, data['recipe_id'])
         if not recipe:
             return {"success": False, "message": "Recipe not found"}
         
         # Parse current items
-        items = json.loads(recipe.items) if recipe.items else []
+        items = recipe.items or []
         action = data.get('action', '')
         ingredient_name = data.get('ingredient_name', '').lower()
         quantity = data.get('quantity')
@@ -866,25 +871,25 @@ async def execute_edit_recipe(data: Dict, db: Session) -> Dict:
             return {"success": False, "message": "Unknown action"}
         
         # Save updated recipe
-        recipe.items = json.dumps(items)
-        db.commit()
+        # Items are edited in place, so mark the JSON column dirty explicitly
+        recipe.items = items
+        flag_modified(recipe, "items")
+        await db.commit()
         
         return {"success": True, "message": message}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Recipe edit execution error: {str(e)}")
         return {"success": False, "message": f"❌ Failed to edit recipe: {str(e)}"}
 
 
-async def execute_add_inventory(data: Dict, db: Session) -> Dict:
+async def execute_add_inventory(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed inventory addition - updates existing or creates new"""
     try:
         if data.get('is_update'):
             # Update existing item - add to quantity
-            existing = db.query(InventoryItem).filter(
-                InventoryItem.id == data['existing_item_id']
-            ).first()
+            existing = await db.get(InventoryItem, data['existing_item_id'])
             
             if not existing:
                 return {"success": False, "message": "❌ Item not found"}
@@ -895,7 +900,7 @@ async def execute_add_inventory(data: Dict, db: Session) -> Dict:
             if data.get('price'):
                 existing.price = float(data['price'])
             
-            db.commit()
+            await db.commit()
             message = f"✅ Added {data['quantity']} {data['unit']} to {existing.name}\nNew total: {existing.quantity} {existing.unit}"
         else:
             # Create new item
@@ -907,27 +912,27 @@ async def execute_add_inventory(data: Dict, db: Session) -> Dict:
                 price=float(data.get('price', 0))
             )
             db.add(new_item)
-            db.commit()
+            await db.commit()
             message = f"✅ Added new item: {data['quantity']} {data['unit']} of {data['item_name']}"
         
         return {"success": True, "message": message}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Inventory add error: {str(e)}")
         return {"success": False, "message": f"❌ Failed: {str(e)}"}
 
 
-async def execute_update_inventory(data: Dict, db: Session) -> Dict:
+async def execute_update_inventory(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed inventory update"""
     try:
-        item = db.query(InventoryItem).filter(InventoryItem.id == data['item_id']).first()
+        item = await db.get(InventoryItem, data['item_id'])
         if not item:
             return {"success": False, "message": "Item not found"}
         
         item.quantity = float(data['quantity'])
         item.unit = data['unit']
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -935,24 +940,35 @@ async def execute_update_inventory(data: Dict, db: Session) -> Dict:
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return {"success": False, "message": f"❌ Failed: {str(e)}"}
 
 
-async def execute_delete_inventory(data: Dict, db: Session) -> Dict:
+async def execute_delete_inventory(data: Dict, db: AsyncSession) -> Dict:
     """Execute confirmed inventory deletion"""
     try:
-        item = db.query(InventoryItem).filter(InventoryItem.id == data['item_id']).first()
+        item = await db.get(InventoryItem, data['item_id'])
         if not item:
             return {"success": False, "message": "Item not found"}
         
         item_name = item.name
-        db.delete(item)
-        db.commit()
+        await db.delete(item)
+        await db.commit()
         
         return {"success": True, "message": f"✅ Removed {item_name} from inventory"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return {"success": False, "message": f"❌ Failed: {str(e)}"}
 
+
+# Confirmed actions by the intent stored in confirmation_data; every executor takes (data, db)
+CONFIRM_EXECUTORS = {
+    "add_recipe": execute_add_recipe,
+    "update_recipe_ingredients": execute_update_recipe_ingredients,
+    "delete_recipe": execute_delete_recipe,
+    "edit_recipe": execute_edit_recipe,
+    "add_inventory": execute_add_inventory,
+    "update_inventory": execute_update_inventory,
+    "delete_inventory": execute_delete_inventory,
+}
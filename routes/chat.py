@@ -1,16 +1,31 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.concurrency import run_in_threadpool
-from pydantic import BaseModel
-from typing import Optional
-import json, os, openai
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Dict, List, Literal, Optional, Tuple
+import asyncio, hashlib, os, re, openai
+from string import Template
+import orjson
+from datetime import datetime
+import httpx
+import tiktoken
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+from cache import redis_client
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     prompt: str
-    language: Optional[str] = "en"  # Added: language support (en/it)
+    language: Literal["en", "it"] = "en"  # Added: language support (en/it)
+
+    @field_validator("language", mode="before")
+    @classmethod
+    def default_language(cls, v):
+        # Older clients send null or "" for the default language
+        return v or "en"
 
 class ChatResponse(BaseModel):
     status: str
@@ -18,22 +33,52 @@ class ChatResponse(BaseModel):
     parsed_data: Optional[dict] = None
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = openai.OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
-# Multi-language system prompts
-SYSTEM_PROMPTS = {
+# One pooled HTTP client for every OpenAI call; the timeout stops slow calls piling up
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    timeout=httpx.Timeout(30.0, connect=5.0),
+)
+client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client) if OPENAI_API_KEY else None
+
+# Single source for item types: generates the prompts' type rules and drives the fast-path parser
+TYPE_KEYWORDS = {
+    "en": {
+        "meat": ("beef", "chicken", "pork", "meat"),
+        "vegetable": ("lettuce", "tomato", "onion", "vegetable"),
+        "fruit": ("apple", "banana", "orange", "fruit"),
+        "dairy": ("milk", "cheese", "yogurt", "dairy"),
+        "beverage": ("water", "juice", "wine", "soda", "beverage"),
+        "grocery": ("sugar", "flour", "pasta", "rice", "bread"),
+        "cleaning": ("soap", "detergent", "cleaner"),
+    },
+    "it": {
+        "meat": ("manzo", "pollo", "maiale", "carne"),
+        "vegetable": ("lattuga", "pomodoro", "pomodori", "cipolla", "cipolle", "verdura"),
+        "fruit": ("mela", "mele", "banana", "banane", "arancia", "arance", "frutta"),
+        "dairy": ("latte", "formaggio", "yogurt", "latticini"),
+        "beverage": ("acqua", "succo", "vino", "bevanda"),
+        "grocery": ("zucchero", "farina", "pasta", "riso", "pane"),
+        "cleaning": ("sapone", "detergente"),
+    },
+}
+# Keyed per language: "latte" is milk in Italian but a coffee drink in English
+TYPE_MAP = {
+    lang: {word: item_type for item_type, words in keywords.items() for word in words}
+    for lang, keywords in TYPE_KEYWORDS.items()
+}
+
+def type_rules(lang: str) -> str:
+    return "\n".join(f"{'/'.join(words)} → {item_type}" for item_type, words in TYPE_KEYWORDS[lang].items())
+
+# Multi-language system prompts; $type_rules is filled in from TYPE_KEYWORDS below
+SYSTEM_PROMPT_TEMPLATES = {
     "en": """You are ChefCode's AI Inventory Parser. Parse commands silently and return only JSON.
 
 Extract: item_name, unit, quantity, unit_price, type, lot_number (optional), expiry_date (optional)
 
 Type detection:
-beef/chicken/pork/meat → meat
-lettuce/tomato/onion/vegetable → vegetable
-apple/banana/orange/fruit → fruit
-milk/cheese/yogurt/dairy → dairy
-water/juice/wine/soda/beverage → beverage
-sugar/flour/pasta/rice/bread → grocery
-soap/detergent/cleaner → cleaning
+$type_rules
 
 Lot number keywords: "lot", "batch", "lot number", "batch number", "LOT"
 Expiry date keywords: "expires", "expiry", "best before", "use by", "exp date", "expiration"
@@ -49,13 +94,7 @@ Output ONLY valid JSON. No explanations.""",
 Estrai: item_name, unit, quantity, unit_price, type, lot_number (opzionale), expiry_date (opzionale)
 
 Rilevamento tipo:
-manzo/pollo/maiale/carne → meat
-lattuga/pomodoro/cipolla/verdura → vegetable
-mela/banana/arancia/frutta → fruit
-latte/formaggio/yogurt/latticini → dairy
-acqua/succo/vino/bevanda → beverage
-zucchero/farina/pasta/riso/pane → grocery
-sapone/detergente → cleaning
+$type_rules
 
 Parole chiave lotto: "lotto", "batch", "numero lotto", "lotto numero"
 Parole chiave scadenza: "scadenza", "scade", "da consumarsi entro", "exp", "data scadenza"
@@ -66,6 +105,287 @@ Se completo: {"status": "complete", "parsed_data": {"item_name": "...", "unit":
 
 Output SOLO JSON valido. Niente spiegazioni."""
 }
+SYSTEM_PROMPTS = {
+    lang: Template(template).substitute(type_rules=type_rules(lang))
+    for lang, template in SYSTEM_PROMPT_TEMPLATES.items()
+}
+
+# "<qty> <unit> <item> at <price> [lot <n>] [exp <date>]" - anything else goes to the model
+FAST_PATH_TEMPLATE = r"""
+    (?P<qty>\d+(?:[.,]\d+)?)\s*(?P<unit>kg|g|gr|l|lt|ml|cl|pcs|pc|pz)\s+
+    (?:{of}\s+)?(?P<item>[^\d@]+?)
+    \s+(?:{at}|@)\s*€?\s*(?P<price>\d+(?:[.,]\d+)?)\s*(?:€|eur|euro|euros)?
+    (?:\s+(?:{lot})\s+(?P<lot>\S+))?
+    (?:\s+(?:{exp})\s+(?P<exp>\S+))?
+"""
+FAST_PATH_PATTERNS = {
+    "en": re.compile(FAST_PATH_TEMPLATE.format(of="of", at="at", lot="lot|batch", exp="exp|expires|expiry"), re.I | re.X),
+    "it": re.compile(FAST_PATH_TEMPLATE.format(of="di", at="a", lot="lotto|batch", exp="scadenza|scade|exp"), re.I | re.X),
+}
+# Numeric dates are only unambiguous once the language's day/month order is known
+EXPIRY_FORMATS = {
+    "en": ("%Y-%m-%d", "%m/%d/%Y"),
+    "it": ("%Y-%m-%d", "%d/%m/%Y"),
+}
+
+def parse_expiry(lang: str, text: str) -> Optional[str]:
+    for fmt in EXPIRY_FORMATS[lang]:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def detect_type(lang: str, item_name: str) -> Optional[str]:
+    # Only a bare keyword is unambiguous: "orange juice" or "chicken stock" needs the model
+    words = item_name.lower().split()
+    if len(words) != 1:
+        return None
+    word = words[0]
+    type_map = TYPE_MAP[lang]
+    return type_map.get(word) or type_map.get(word.rstrip("s"))
+
+def fast_parse(lang: str, prompt: str) -> Optional[dict]:
+    """Parse simple commands without the model; None means the LLM has to handle it"""
+    pattern = FAST_PATH_PATTERNS.get(lang)
+    match = pattern.fullmatch(prompt.strip()) if pattern else None
+    if not match:
+        return None
+
+    item_name = match["item"].strip()
+    item_type = detect_type(lang, item_name)
+    if item_type is None:
+        return None
+
+    expiry_date = None
+    if match["exp"]:
+        expiry_date = parse_expiry(lang, match["exp"])
+        if expiry_date is None:
+            return None
+
+    return {
+        "status": "complete",
+        "parsed_data": {
+            "item_name": item_name,
+            "unit": match["unit"].lower(),
+            "quantity": float(match["qty"].replace(",", ".")),
+            "unit_price": float(match["price"].replace(",", ".")),
+            "type": item_type,
+            "lot_number": match["lot"],
+            "expiry_date": expiry_date,
+        },
+    }
+
+# Appended to the system prompt when several commands share one call
+BATCH_INSTRUCTIONS = """
+
+The user message may be a JSON array of commands, each {"id": ..., "command": "..."}. Parse each command independently and return {"results": [...]}, with one object per command in the format above plus its "id" copied unchanged."""
+
+# Micro-batching: concurrent prompts in the same language share one OpenAI call
+BATCH_WINDOW = 0.03  # seconds to wait for more prompts after the first one arrives
+MAX_BATCH = 32
+BATCH_TOKEN_BUDGET = 2500  # input tokens (system prompt + commands) per batched call
+MAX_REPLY_TOKENS = 300  # per command; a parse reply is a single small JSON object
+
+try:
+    ENCODING = tiktoken.encoding_for_model("gpt-4o-mini")
+except Exception as e:
+    # The BPE file is downloaded on first use; offline hosts fall back to an estimate
+    logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+    ENCODING = None
+
+def count_tokens(text: str) -> int:
+    if ENCODING is None:
+        return len(text) // 4 + 1
+    return len(ENCODING.encode(text))
+
+# Counted once at import; the prompts never change at runtime
+SYSTEM_PROMPT_TOKENS = {lang: count_tokens(prompt) for lang, prompt in SYSTEM_PROMPTS.items()}
+BATCH_INSTRUCTIONS_TOKENS = count_tokens(BATCH_INSTRUCTIONS)
+
+batch_queue: Optional[asyncio.Queue] = None
+batch_worker: Optional[asyncio.Task] = None
+pending_batches = set()
+
+async def llm_parse(lang: str, prompt: str) -> dict:
+    """Parse a single command; raises orjson.JSONDecodeError on a malformed reply"""
+    system_prompt = SYSTEM_PROMPTS.get(lang, SYSTEM_PROMPTS["en"])
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0,
+        max_tokens=MAX_REPLY_TOKENS,
+        response_format={"type": "json_object"}
+    )
+    ai_response = response.choices[0].message.content.strip()
+    try:
+        return orjson.loads(ai_response)
+    except orjson.JSONDecodeError:
+        logger.error(f"Invalid JSON response from OpenAI: {ai_response}")
+        raise
+
+def match_batch_results(results, count: int) -> List[Optional[dict]]:
+    """Pair each reply with its command by id; a missing, unknown or repeated id leaves None"""
+    matched: List[Optional[dict]] = [None] * count
+    seen = set()
+    for result in results if isinstance(results, list) else ():
+        if not isinstance(result, dict):
+            continue
+        result_id = result.pop("id", None)
+        if not isinstance(result_id, int) or not 0 <= result_id < count:
+            continue
+        matched[result_id] = None if result_id in seen else result
+        seen.add(result_id)
+    return matched
+
+async def llm_parse_many(lang: str, prompts: List[str]) -> List[dict]:
+    """Parse several commands in one call, retrying individually any command whose reply isn't matched by id"""
+    system_prompt = SYSTEM_PROMPTS.get(lang, SYSTEM_PROMPTS["en"]) + BATCH_INSTRUCTIONS
+    # Commands go in as JSON so a prompt's own newlines or numbering can't shift the replies
+    user_message = orjson.dumps([{"id": i, "command": prompt} for i, prompt in enumerate(prompts)]).decode()
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ],
+        temperature=0,
+        max_tokens=MAX_REPLY_TOKENS * len(prompts),
+        response_format={"type": "json_object"}
+    )
+    ai_response = response.choices[0].message.content.strip()
+    try:
+        results = orjson.loads(ai_response).get("results")
+    except (orjson.JSONDecodeError, AttributeError):
+        results = None
+    matched = match_batch_results(results, len(prompts))
+    unmatched = [i for i, result in enumerate(matched) if result is None]
+    if unmatched:
+        logger.warning(f"Batched OpenAI reply did not match {len(unmatched)} of {len(prompts)} prompts, retrying them individually")
+        retried = await asyncio.gather(*(llm_parse(lang, prompts[i]) for i in unmatched), return_exceptions=True)
+        for i, result in zip(unmatched, retried):
+            matched[i] = result
+    return matched
+
+def split_by_token_budget(lang: str, items: List[Tuple]) -> List[List[Tuple]]:
+    """Group queued (lang, prompt, future) items so no batch exceeds the token budget"""
+    available = BATCH_TOKEN_BUDGET - SYSTEM_PROMPT_TOKENS.get(lang, SYSTEM_PROMPT_TOKENS["en"]) - BATCH_INSTRUCTIONS_TOKENS
+    batches, current, used = [], [], 0
+    for item in items:
+        tokens = count_tokens(item[1])
+        if current and used + tokens > available:
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def dispatch_batch(lang: str, items: List[Tuple]):
+    """Run one OpenAI call for the batch and resolve every waiting request"""
+    try:
+        if len(items) == 1:
+            results = [await llm_parse(lang, items[0][1])]
+        else:
+            results = await llm_parse_many(lang, [prompt for _, prompt, _ in items])
+    except Exception as e:
+        results = [e] * len(items)
+    for (_, _, future), result in zip(items, results):
+        if future.done():
+            continue
+        if isinstance(result, BaseException):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+async def run_batch_worker():
+    """Drain the queue in windows of BATCH_WINDOW seconds or MAX_BATCH prompts"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await batch_queue.get()]
+        deadline = loop.time() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(batch_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Each language has its own system prompt, so batches never mix languages
+        groups: Dict[str, List[Tuple]] = {}
+        for item in batch:
+            groups.setdefault(item[0], []).append(item)
+        for lang, items in groups.items():
+            for chunk in split_by_token_budget(lang, items):
+                task = asyncio.create_task(dispatch_batch(lang, chunk))
+                pending_batches.add(task)
+                task.add_done_callback(pending_batches.discard)
+
+async def submit_prompt(lang: str, prompt: str) -> dict:
+    """Queue a prompt for the batch worker, or call OpenAI directly if it isn't running"""
+    if batch_worker is None:
+        return await llm_parse(lang, prompt)
+    future = asyncio.get_running_loop().create_future()
+    await batch_queue.put((lang, prompt, future))
+    return await future
+
+# Staff repeat the same phrases, so completed parses are reused for an hour
+PARSE_CACHE_TTL = 3600
+parse_cache = TTLCache(maxsize=4096, ttl=PARSE_CACHE_TTL)
+parse_cache_lock = asyncio.Lock()
+
+def redis_parse_key(lang: str, normalized: str) -> str:
+    return f"cc:{lang}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+async def get_cached_parse(lang: str, normalized: str) -> Optional[dict]:
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(redis_parse_key(lang, normalized))
+            return orjson.loads(cached) if cached else None
+        except RedisError as e:
+            logger.warning(f"Redis parse cache unavailable, using local cache: {e}")
+    async with parse_cache_lock:
+        return parse_cache.get((lang, normalized))
+
+async def set_cached_parse(lang: str, normalized: str, parsed: dict):
+    if redis_client is not None:
+        try:
+            await redis_client.set(redis_parse_key(lang, normalized), orjson.dumps(parsed), ex=PARSE_CACHE_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis parse cache unavailable, using local cache: {e}")
+    async with parse_cache_lock:
+        parse_cache[(lang, normalized)] = parsed
+
+async def cached_parse(lang: str, prompt: str) -> dict:
+    """Return a cached parse for the normalized prompt, or ask OpenAI and cache complete results"""
+    normalized = " ".join(prompt.lower().split())
+    parsed = await get_cached_parse(lang, normalized)
+    if parsed is not None:
+        return parsed
+
+    parsed = await submit_prompt(lang, prompt)
+    # ask_price replies depend on the conversation, so only complete parses are cached
+    if isinstance(parsed, dict) and parsed.get("status") == "complete":
+        await set_cached_parse(lang, normalized, parsed)
+    return parsed
+
+async def start_batch_worker():
+    global batch_queue, batch_worker
+    if client:
+        batch_queue = asyncio.Queue()
+        batch_worker = asyncio.create_task(run_batch_worker())
+
+async def close_http_client():
+    if batch_worker:
+        batch_worker.cancel()
+    await http_client.aclose()
 
 # Added: Health check endpoint
 @router.get("/chat/health")
@@ -78,49 +398,42 @@ async def chat_health():
         "default_language": "en"
     }
 
-@router.post("/chatgpt-smart", response_model=ChatResponse)
+# User-facing messages, built once rather than per request
+MOCK_MESSAGE = {
+    "en": "ChatGPT integration ready. Please set OPENAI_API_KEY environment variable to enable AI functionality.",
+    "it": "Integrazione ChatGPT pronta. Imposta la variabile d'ambiente OPENAI_API_KEY per abilitare la funzionalità AI."
+}
+SUCCESS_TEMPLATE = {
+    "en": "Item '{name}' added to inventory.",
+    "it": "Articolo '{name}' aggiunto all'inventario."
+}
+ERROR_MESSAGES = {
+    "parse": {
+        "en": "Unable to parse AI response. Please try again.",
+        "it": "Impossibile analizzare la risposta AI. Riprova."
+    },
+    "format": {
+        "en": "Unexpected AI response format",
+        "it": "Formato risposta AI inaspettato"
+    },
+    "generic": {
+        "en": "An error occurred while processing your request. Please try again.",
+        "it": "Si è verificato un errore durante l'elaborazione della richiesta. Riprova."
+    },
+}
+
+async def mock_inventory_command(request: ChatRequest):
+    # Mock response when API key is not set
+    return ChatResponse(status="mock", message=MOCK_MESSAGE[request.language])
+
 async def parse_inventory_command(request: ChatRequest):
-    if not client:
-        # Mock response when API key is not set
-        lang = request.language or "en"
-        mock_message = {
-            "en": "ChatGPT integration ready. Please set OPENAI_API_KEY environment variable to enable AI functionality.",
-            "it": "Integrazione ChatGPT pronta. Imposta la variabile d'ambiente OPENAI_API_KEY per abilitare la funzionalità AI."
-        }
-        return ChatResponse(
-            status="mock",
-            message=mock_message.get(lang, mock_message["en"])
-        )
-    
-    lang = request.language or "en"
+    lang = request.language
     
     try:
-        # Get language-specific system prompt
-        system_prompt = SYSTEM_PROMPTS.get(lang, SYSTEM_PROMPTS["en"])
-        
-        # Run blocking OpenAI call in thread pool to avoid blocking event loop
-        response = await run_in_threadpool(
-            lambda: client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": request.prompt}
-                ],
-                temperature=0
-            )
-        )
-
-        ai_response = response.choices[0].message.content.strip()
-
         try:
-            parsed = json.loads(ai_response)
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON response from OpenAI: {ai_response}")
-            error_msg = {
-                "en": "Unable to parse AI response. Please try again.",
-                "it": "Impossibile analizzare la risposta AI. Riprova."
-            }
-            raise HTTPException(status_code=500, detail=error_msg.get(lang, error_msg["en"]))
+            parsed = fast_parse(lang, request.prompt) or await cached_parse(lang, request.prompt)
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=500, detail=ERROR_MESSAGES["parse"][lang])
 
         # If missing price → ask user
         if parsed.get("status") == "ask_price":
@@ -132,22 +445,14 @@ async def parse_inventory_command(request: ChatRequest):
         # If complete → save to inventory
         elif parsed.get("status") == "complete":
             data = parsed.get("parsed_data")
-            success_msg = {
-                "en": f"Item '{data.get('item_name')}' added to inventory.",
-                "it": f"Articolo '{data.get('item_name')}' aggiunto all'inventario."
-            }
             return ChatResponse(
                 status="success",
-                message=success_msg.get(lang, success_msg["en"]),
+                message=SUCCESS_TEMPLATE[lang].format(name=data.get("item_name")),
                 parsed_data=data
             )
 
         else:
-            error_msg = {
-                "en": "Unexpected AI response format",
-                "it": "Formato risposta AI inaspettato"
-            }
-            raise HTTPException(status_code=400, detail=error_msg.get(lang, error_msg["en"]))
+            raise HTTPException(status_code=400, detail=ERROR_MESSAGES["format"][lang])
 
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -155,8 +460,9 @@ async def parse_inventory_command(request: ChatRequest):
     except Exception as e:
         # Log the detailed error internally but return generic message to user
         logger.error(f"ChatGPT error: {type(e).__name__} - {str(e)}")
-        error_msg = {
-            "en": "An error occurred while processing your request. Please try again.",
-            "it": "Si è verificato un errore durante l'elaborazione della richiesta. Riprova."
-        }
-        raise HTTPException(status_code=500, detail=error_msg.get(lang, error_msg["en"]))
+        raise HTTPException(status_code=500, detail=ERROR_MESSAGES["generic"][lang])
+
+# The key is fixed for the process lifetime, so pick the implementation once instead of checking per request
+router.post("/chatgpt-smart", response_model=ChatResponse)(
+    parse_inventory_command if client else mock_inventory_command
+)
@@ -1,65 +1,94 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, cast, select
+from database import AsyncSessionLocal
+from data_version import CURRENT_VERSION, etag_matches, make_etag
 from models import InventoryItem, Recipe, Task
-import json
-from typing import Dict, Any
+import orjson
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Only the emitted columns are selected, so no ORM objects are built for the full dump
+INVENTORY_COLUMNS = select(
+    InventoryItem.id, InventoryItem.name, InventoryItem.unit, InventoryItem.quantity,
+    InventoryItem.category, InventoryItem.price, InventoryItem.lot_number, InventoryItem.expiry_date
+)
+# items is cast to its JSON text in SQL (JSONB would otherwise be decoded by the driver) so it can be embedded verbatim
+RECIPE_COLUMNS = select(Recipe.name, cast(Recipe.items, Text).label("items"), Recipe.yield_data)
+TASK_COLUMNS = select(Task.id, Task.recipe, Task.quantity, Task.assigned_to, Task.status)
+
+# Rows fetched from the cursor and encoded per chunk of the response
+STREAM_BATCH_SIZE = 1000
+
+def inventory_json(row) -> bytes:
+    return orjson.dumps({
+        "id": row.id,
+        "name": row.name,
+        "unit": row.unit,
+        "quantity": row.quantity,
+        "category": row.category,
+        "price": row.price,
+        "lot_number": row.lot_number,
+        "expiry_date": row.expiry_date  # orjson renders dates as ISO strings
+    })
+
+def json_fragment(value) -> orjson.Fragment:
+    """Embed stored JSON text as-is; values the driver already decoded are encoded again"""
+    if isinstance(value, (str, bytes)):
+        return orjson.Fragment(value)
+    return orjson.Fragment(orjson.dumps(value))
+
+def recipe_json(row) -> bytes:
+    # Recipes are an object keyed by name, so each entry is "name":{...}
+    # items/yield are stored as JSON text and embedded as-is, with no decode/re-encode per row
+    return orjson.dumps(row.name) + b":" + orjson.dumps({
+        "items": json_fragment(row.items) if row.items else [],
+        "yield": json_fragment(row.yield_data) if row.yield_data else None
+    })
+
+def task_json(row) -> bytes:
+    return orjson.dumps({
+        "id": row.id,
+        "recipe": row.recipe,
+        "quantity": row.quantity,
+        "assignedTo": row.assigned_to,
+        "status": row.status
+    })
+
+async def stream_rows(session, stmt, encode):
+    """Yield comma-separated JSON for the rows of one select, a batch at a time"""
+    result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    separator = b""
+    async for rows in result.partitions():
+        yield separator + b",".join(encode(row) for row in rows)
+        separator = b","
+
+async def stream_all_data():
+    async with AsyncSessionLocal() as session:
+        yield b'{"inventory":['
+        async for chunk in stream_rows(session, INVENTORY_COLUMNS, inventory_json):
+            yield chunk
+        yield b'],"recipes":{'
+        async for chunk in stream_rows(session, RECIPE_COLUMNS, recipe_json):
+            yield chunk
+        yield b'},"tasks":['
+        async for chunk in stream_rows(session, TASK_COLUMNS, task_json):
+            yield chunk
+        yield b']}'
+
+async def fetch_version():
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(CURRENT_VERSION)
 
 @router.get("/data")
-async def get_all_data(db: Session = Depends(get_db)):
+async def get_all_data(request: Request):
     """Get all data for frontend synchronization - matches original backend format"""
     
-    # Get inventory
-    inventory_items = db.query(InventoryItem).all()
-    inventory = [
-        {
-            "id": item.id,
-            "name": item.name,
-            "unit": item.unit,
-            "quantity": item.quantity,
-            "category": item.category,
-            "price": item.price,
-            "lot_number": item.lot_number,
-            "expiry_date": item.expiry_date.isoformat() if item.expiry_date else None
-        }
-        for item in inventory_items
-    ]
-    
-    # Get recipes
-    recipe_items = db.query(Recipe).all()
-    recipes = {}
-    for recipe in recipe_items:
-        items_data = json.loads(recipe.items) if recipe.items else []
-        yield_data = json.loads(recipe.yield_data) if recipe.yield_data else None
-        recipes[recipe.name] = {
-            "items": items_data,
-            "yield": yield_data
-        }
-    
-    # Get tasks
-    task_items = db.query(Task).all()
-    tasks = [
-        {
-            "id": task.id,
-            "recipe": task.recipe,
-            "quantity": task.quantity,
-            "assignedTo": task.assigned_to,
-            "status": task.status
-        }
-        for task in task_items
-    ]
+    # Unchanged data costs one primary-key lookup and an empty 304
+    etag = make_etag(await fetch_version())
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    return {
-        "inventory": inventory,
-        "recipes": recipes,
-        "tasks": tasks
-    }
\ No newline at end of file
+    # Rows are encoded and sent as they come off the cursor instead of building the whole payload
+    return StreamingResponse(stream_all_data(), media_type="application/json", headers=cache_headers)
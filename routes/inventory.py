@@ -1,77 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from deps import DBSession
 from models import InventoryItem
 from schemas import InventoryItemCreate, InventoryItemUpdate, InventoryItemResponse
 from typing import List
 from auth import verify_api_key
+from data_version import CURRENT_VERSION, etag_matches, make_etag
 
 router = APIRouter()
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Statements built once so SQLAlchemy's compiled cache is hit on every request
+ALL_ITEMS = select(InventoryItem)
+ITEM_BY_ID = select(InventoryItem).where(InventoryItem.id == bindparam("id"))
+FIRST_ID_BY_NAME = select(InventoryItem.id).where(InventoryItem.name == bindparam("item_name")).limit(1).scalar_subquery()
+MERGE_QUANTITY = (
+    update(InventoryItem)
+    .where(InventoryItem.id == FIRST_ID_BY_NAME, func.abs(InventoryItem.price - bindparam("new_price")) < 0.01)
+    .values(quantity=InventoryItem.quantity + bindparam("add_quantity"))
+    .returning(InventoryItem)
+    .execution_options(synchronize_session=False)
+)
+DELETE_ITEM_BY_ID = (
+    delete(InventoryItem)
+    .where(InventoryItem.id == bindparam("id"))
+    .returning(InventoryItem.id)
+    .execution_options(synchronize_session=False)
+)
 
 @router.get("/inventory", response_model=List[InventoryItemResponse])
-async def get_inventory(db: Session = Depends(get_db)):
+def get_inventory(request: Request, response: Response, db: DBSession):
     """Get all inventory items"""
-    items = db.query(InventoryItem).all()
+    etag = make_etag(db.scalar(CURRENT_VERSION))
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    items = db.scalars(ALL_ITEMS).all()
     return items
 
 @router.post("/inventory", response_model=InventoryItemResponse)
-async def add_inventory_item(
+def add_inventory_item(
     item: InventoryItemCreate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Add a new inventory item"""
-    # Check if item with same name already exists
-    existing_item = db.query(InventoryItem).filter(InventoryItem.name == item.name).first()
-    
-    if existing_item:
-        # Update quantity if same price, otherwise create new entry
-        if abs(existing_item.price - item.price) < 0.01:  # Same price
-            existing_item.quantity += item.quantity
-            db.commit()
-            db.refresh(existing_item)
-            return existing_item
+    # Same name and price: add to the first matching row atomically (no read-modify-write)
+    merged_item = db.execute(
+        MERGE_QUANTITY,
+        {"item_name": item.name, "new_price": item.price, "add_quantity": item.quantity}
+    ).scalar_one_or_none()
+    if merged_item:
+        db.commit()
+        return merged_item
     
-    # Create new item
-    db_item = InventoryItem(**item.dict())
-    db.add(db_item)
+    # Otherwise create new entry
+    db_item = db.execute(insert(InventoryItem).values(**item.dict()).returning(InventoryItem)).scalar_one()
     db.commit()
-    db.refresh(db_item)
     return db_item
 
 @router.put("/inventory/{item_id}")
-async def update_inventory_item(
+def update_inventory_item(
     item_id: int, 
     item: InventoryItemUpdate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Update an inventory item (partial update supported)"""
-    db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
     # Only update fields that were explicitly set (exclude_unset=True)
     update_data = item.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_item, key, value)
+    if update_data:
+        # One UPDATE ... RETURNING instead of SELECT + UPDATE + refresh
+        stmt = (
+            update(InventoryItem)
+            .where(InventoryItem.id == item_id)
+            .values(**update_data)
+            .returning(InventoryItem)
+            .execution_options(synchronize_session=False)
+        )
+        db_item = db.execute(stmt).scalar_one_or_none()
+    else:
+        db_item = db.execute(ITEM_BY_ID, {"id": item_id}).scalar_one_or_none()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item not found")
     
     db.commit()
-    db.refresh(db_item)
     return db_item
 
+def delete_item(db, item_id: int):
+    """Delete an item in a single DELETE ... RETURNING, 404 if it did not exist"""
+    deleted_id = db.execute(DELETE_ITEM_BY_ID, {"id": item_id}).scalar_one_or_none()
+    if deleted_id is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    db.commit()
+
 @router.delete("/inventory/delete")
-async def delete_inventory_item_by_id(
+def delete_inventory_item_by_id(
     request: dict,
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Delete an inventory item by ID from request body"""
@@ -79,25 +106,15 @@ async def delete_inventory_item_by_id(
     if not item_id:
         raise HTTPException(status_code=400, detail="Item ID is required")
     
-    db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(db_item)
-    db.commit()
+    delete_item(db, item_id)
     return {"message": "Item deleted successfully"}
 
 @router.delete("/inventory/{item_id}")
-async def delete_inventory_item(
+def delete_inventory_item(
     item_id: int, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Delete an inventory item"""
-    db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    db.delete(db_item)
-    db.commit()
-    return {"message": "Item deleted successfully"}
\ No newline at end of file
+    delete_item(db, item_id)
+    return {"message": "Item deleted successfully"}
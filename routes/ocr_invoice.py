@@ -5,45 +5,58 @@ Extracts structured invoice data with 100% accuracy
 
 import os
 import json
+import logging
 import io
 import sys
 import re
+import asyncio
+import aiofiles
+import orjson
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+import google.auth
 from google.cloud import documentai_v1 as documentai
-from google.api_core.client_options import ClientOptions
+from google.cloud.documentai_v1.services.document_processor_service.transports import (
+    DocumentProcessorServiceGrpcAsyncIOTransport,
+)
+from google.oauth2 import service_account
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-# Set UTF-8 encoding for stdout to handle emoji characters
-try:
-    if hasattr(sys.stdout, 'reconfigure'):
-        sys.stdout.reconfigure(encoding='utf-8')
-except Exception:
-    pass  # Ignore if reconfigure is not available
-
 # Load environment variables
 load_dotenv()
 
-# Safe print function that handles encoding errors
-def safe_print(*args, **kwargs):
-    """Print with automatic encoding error handling"""
-    try:
-        print(*args, **kwargs)
-    except UnicodeEncodeError:
-        # Fallback: remove emojis and special characters
-        safe_args = []
-        for arg in args:
-            if isinstance(arg, str):
-                # Replace common emojis with text equivalents
-                safe_str = arg.replace('✓', '[OK]').replace('⚠', '[WARNING]').replace('✅', '[OK]').replace('❌', '[ERROR]')
-                # Encode to ASCII, ignoring errors
-                safe_str = safe_str.encode('ascii', 'ignore').decode('ascii')
-                safe_args.append(safe_str)
-            else:
-                safe_args.append(arg)
-        print(*safe_args, **kwargs)
+logger = logging.getLogger(__name__)
+
+# Set UTF-8 encoding for stdout to handle emoji characters; unencodable characters are replaced, never raised
+try:
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    STDOUT_IS_SAFE = True
+except Exception:
+    STDOUT_IS_SAFE = False  # reconfigure not available (stdout replaced by a non-TextIOWrapper stream)
+
+if STDOUT_IS_SAFE:
+    safe_print = print
+else:
+    # Safe print function that handles encoding errors
+    def safe_print(*args, **kwargs):
+        """Print with automatic encoding error handling"""
+        try:
+            print(*args, **kwargs)
+        except UnicodeEncodeError:
+            # Fallback: remove emojis and special characters
+            safe_args = []
+            for arg in args:
+                if isinstance(arg, str):
+                    # Replace common emojis with text equivalents
+                    safe_str = arg.replace('✓', '[OK]').replace('⚠', '[WARNING]').replace('✅', '[OK]').replace('❌', '[ERROR]')
+                    # Encode to ASCII, ignoring errors
+                    safe_str = safe_str.encode('ascii', 'ignore').decode('ascii')
+                    safe_args.append(safe_str)
+                else:
+                    safe_args.append(arg)
+            print(*safe_args, **kwargs)
 
 # Configuration
 PROJECT_ID = os.getenv("PROJECT_ID")
@@ -55,139 +68,44 @@ GOOGLE_CREDS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 # Don't validate at import time - let endpoints handle it
 # This prevents crashes when environment variables are missing
 
+GEMINI_GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "top_p": 0.8,
+    "top_k": 20,
+    "max_output_tokens": 8192,  # Increased for longer invoices
+}
+# gRPC options for the Document AI channel: ping during long OCR calls so a dropped connection
+# is noticed quickly, and keep the library's unlimited message sizes for large multi-page documents
+DOCAI_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
 
-class InvoiceOCR:
-    """Enhanced Invoice OCR using Document AI + Gemini"""
-    
-    def __init__(self, project_id: str, location: str, processor_id: str, gemini_api_key: str):
-        self.project_id = project_id
-        self.location = location
-        self.processor_id = processor_id
-        self.processor_name = f"projects/{project_id}/locations/{location}/processors/{processor_id}"
-        
-        # Initialize Document AI client
-        self._init_document_ai()
-        
-        # Initialize Gemini
-        genai.configure(api_key=gemini_api_key)
-        self.gemini_model = genai.GenerativeModel(
-            'gemini-2.0-flash',
-            generation_config={
-                "temperature": 0.1,
-                "top_p": 0.8,
-                "top_k": 20,
-                "max_output_tokens": 8192,  # Increased for longer invoices
-            }
-        )
-        
-        safe_print("✓ Invoice OCR processor initialized successfully")
-    
-    def _init_document_ai(self):
-        """Initialize Document AI client with credentials"""
-        try:
-            # First try: Use the invoice_key.json file directly
-            invoice_key_path = Path(__file__).resolve().parent.parent / "invoice_key.json"
-            if invoice_key_path.exists():
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(invoice_key_path)
-                opts = ClientOptions(api_endpoint=f"{self.location}-documentai.googleapis.com")
-                self.docai_client = documentai.DocumentProcessorServiceClient(client_options=opts)
-                safe_print(f"✓ Using Google Cloud credentials from: {invoice_key_path}")
-                return
-            
-            # Second try: Check if GOOGLE_CREDS is JSON content
-            if GOOGLE_CREDS and GOOGLE_CREDS.strip().startswith('{'):
-                try:
-                    import json
-                    from google.oauth2 import service_account
-                    
-                    creds_dict = json.loads(GOOGLE_CREDS)
-                    credentials = service_account.Credentials.from_service_account_info(creds_dict)
-                    
-                    opts = ClientOptions(api_endpoint=f"{self.location}-documentai.googleapis.com")
-                    self.docai_client = documentai.DocumentProcessorServiceClient(
-                        client_options=opts,
-                        credentials=credentials
-                    )
-                    safe_print(f"✓ Using Google Cloud credentials from JSON content")
-                    return
-                except Exception as e:
-                    safe_print(f"⚠ Could not load credentials from JSON: {e}")
-            
-            # Third try: Use GOOGLE_CREDS as file path
-            if GOOGLE_CREDS and Path(GOOGLE_CREDS).exists():
-                abs_path = str(Path(GOOGLE_CREDS).absolute())
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = abs_path
-                opts = ClientOptions(api_endpoint=f"{self.location}-documentai.googleapis.com")
-                self.docai_client = documentai.DocumentProcessorServiceClient(client_options=opts)
-                safe_print(f"✓ Using Google Cloud credentials from file: {abs_path}")
-                return
-            
-            # Fallback: Use default credentials
-            opts = ClientOptions(api_endpoint=f"{self.location}-documentai.googleapis.com")
-            self.docai_client = documentai.DocumentProcessorServiceClient(client_options=opts)
-            safe_print("✓ Using default Google Cloud credentials")
-            
-        except Exception as e:
-            safe_print(f"❌ Error initializing Document AI client: {e}")
-            raise
-    
-    def process_with_document_ai(self, file_path: str) -> str:
-        """Extract text from invoice using Document AI OCR"""
-        with open(file_path, "rb") as file:
-            file_content = file.read()
-        
-        # Detect MIME type
-        mime_type = self._detect_mime_type(file_path)
-        
-        # Create Document AI request
-        raw_document = documentai.RawDocument(
-            content=file_content,
-            mime_type=mime_type
-        )
-        
-        request = documentai.ProcessRequest(
-            name=self.processor_name,
-            raw_document=raw_document
-        )
-        
-        # Process document
-        result = self.docai_client.process_document(request=request)
-        document = result.document
-        
-        return document.text
-    
-    def process_with_gemini_vision(self, file_path: str, raw_text: str = None) -> Dict[str, Any]:
-        """
-        Use Gemini AI to analyze invoice with both image and text
-        """
-        # Create the prompt for Gemini
-        prompt = self._create_gemini_prompt(raw_text)
-        
-        # Read and prepare the image
-        if file_path and Path(file_path).exists():
-            try:
-                with open(file_path, 'rb') as f:
-                    image_bytes = f.read()
-                
-                # Import PIL for image handling
-                from PIL import Image
-                image = Image.open(io.BytesIO(image_bytes))
-                
-                # Generate response with IMAGE + TEXT
-                response = self.gemini_model.generate_content([prompt, image])
-                
-            except Exception as e:
-                safe_print(f"Warning: Could not load image, falling back to text-only: {e}")
-                response = self.gemini_model.generate_content(prompt)
-        else:
-            response = self.gemini_model.generate_content(prompt)
-        
-        # Parse JSON from response
-        return self._parse_gemini_response(response.text)
-    
-    def _create_gemini_prompt(self, raw_text: Optional[str] = None) -> str:
-        """Create a detailed prompt for Gemini to extract invoice data"""
-        prompt = """CRITICAL INSTRUCTIONS:
+# Invoice file types accepted for upload, by extension
+_MIME_MAP: Dict[str, str] = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.tiff': 'image/tiff',
+    '.tif': 'image/tiff'
+}
+_ALLOWED_EXT = frozenset(_MIME_MAP)
+
+# Redundant quantity prefixes in descriptions, like "2x ", "1× ", "3 x "
+_QTY_PREFIX_RE = re.compile(r'^(\d+\.?\d*)\s*[x×]\s*', re.IGNORECASE)
+# Anything but alphanumerics, dots, hyphens and underscores in uploaded filenames
+_SAFE_NAME_RE = re.compile(r'[^\w\-_.]')
+
+# Markdown code fence opening or closing the Gemini response
+_FENCE_RE = re.compile(r'^\s*```(?:json|JSON)?\s*|\s*```\s*$')
+_JSON_DECODER = json.JSONDecoder()
+
+
+# The invoice extraction prompt, built once instead of on every request
+_PROMPT = """CRITICAL INSTRUCTIONS:
         You are a multilingual AI specialized in extracting and structuring invoice data from text and image.
         You must keep all field names in English but preserve content in the same language as the document (e.g., Italian item descriptions).
 
@@ -360,63 +278,175 @@ class InvoiceOCR:
         }
         """
 
-        return prompt
+
+def _corrected_quantity(quantity: float, unit_price: float, total_price: float) -> Optional[float]:
+    """
+    Numeric core of the quantity check: the quantity implied by total_price ÷ unit_price
+    when quantity × unit_price is off by more than 2%, otherwise None
+    """
+    # Skip if any value is 0 or missing
+    if quantity == 0 or unit_price == 0 or total_price == 0:
+        return None
     
-    def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse JSON from Gemini response with robust error handling"""
+    # Check the expected total is within 2% tolerance
+    expected_total = round(quantity * unit_price, 2)
+    if abs(expected_total - total_price) <= 0.02 * total_price:
+        return None
+    
+    # Math is wrong! Recalculate quantity
+    return round(total_price / unit_price, 2)
+
+
+class InvoiceOCR:
+    """Enhanced Invoice OCR using Document AI + Gemini"""
+    
+    # Parsed credentials are cached on the class so re-initialisation skips reading and parsing key files
+    _credentials = None
+    _credentials_source = None
+    
+    def __init__(self, project_id: str, location: str, processor_id: str, gemini_api_key: str):
+        self.project_id = project_id
+        self.location = location
+        self.processor_id = processor_id
+        self.processor_name = f"projects/{project_id}/locations/{location}/processors/{processor_id}"
+        
+        # Initialize Document AI client
+        self._init_document_ai()
+        
+        # Initialize Gemini
+        genai.configure(api_key=gemini_api_key)
+        self.gemini_model = genai.GenerativeModel(
+            'gemini-2.0-flash',
+            generation_config=GEMINI_GENERATION_CONFIG
+        )
+        
+        safe_print("✓ Invoice OCR processor initialized successfully")
+    
+    @classmethod
+    def _load_credentials(cls):
+        """Resolve Google Cloud credentials once and share them across processor instances"""
+        if cls._credentials_source is not None:
+            return cls._credentials, cls._credentials_source
+        
+        credentials = None
+        source = "default Google Cloud credentials"
+        
+        # First try: Use the invoice_key.json file directly
+        invoice_key_path = Path(__file__).resolve().parent.parent / "invoice_key.json"
+        if invoice_key_path.exists():
+            credentials, _ = google.auth.load_credentials_from_file(str(invoice_key_path))
+            source = f"Google Cloud credentials from: {invoice_key_path}"
+        
+        # Second try: Check if GOOGLE_CREDS is JSON content
+        elif GOOGLE_CREDS and GOOGLE_CREDS.strip().startswith('{'):
+            try:
+                credentials = service_account.Credentials.from_service_account_info(json.loads(GOOGLE_CREDS))
+                source = "Google Cloud credentials from JSON content"
+            except Exception as e:
+                safe_print(f"⚠ Could not load credentials from JSON: {e}")
+        
+        # Third try: Use GOOGLE_CREDS as file path
+        if credentials is None and GOOGLE_CREDS and Path(GOOGLE_CREDS).exists():
+            abs_path = str(Path(GOOGLE_CREDS).absolute())
+            credentials, _ = google.auth.load_credentials_from_file(abs_path)
+            source = f"Google Cloud credentials from file: {abs_path}"
+        
+        # Fallback (credentials None): the client library uses default credentials
+        cls._credentials, cls._credentials_source = credentials, source
+        return credentials, source
+    
+    def _init_document_ai(self):
+        """Initialize Document AI client with credentials"""
         try:
-            # Remove markdown code blocks if present
-            text = response_text.strip()
-            
-            # Remove various markdown formats
-            if text.startswith("```json"):
-                text = text[7:]
-            elif text.startswith("```JSON"):
-                text = text[7:]
-            elif text.startswith("```"):
-                text = text[3:]
-            
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            text = text.strip()
-            
-            # Find JSON object if there's extra text
-            if not text.startswith("{"):
-                start = text.find("{")
-                if start != -1:
-                    text = text[start:]
-            
-            # Try to parse incrementally - find first valid complete JSON object
-            # This handles cases where Gemini adds garbage after the JSON
-            brace_count = 0
-            in_string = False
-            escape_next = False
+            credentials, source = self._load_credentials()
+            host = f"{self.location}-documentai.googleapis.com"
+            # Own channel so keepalive can be tuned; the client library would otherwise build a default one
+            channel = DocumentProcessorServiceGrpcAsyncIOTransport.create_channel(
+                f"{host}:443",
+                credentials=credentials,
+                options=DOCAI_CHANNEL_OPTIONS
+            )
+            self.docai_client = documentai.DocumentProcessorServiceAsyncClient(
+                transport=DocumentProcessorServiceGrpcAsyncIOTransport(host=host, channel=channel)
+            )
+            safe_print(f"✓ Using {source}")
             
-            for i, char in enumerate(text):
-                # Handle string state to avoid counting braces inside strings
-                if char == '"' and not escape_next:
-                    in_string = not in_string
-                elif char == '\\' and not escape_next:
-                    escape_next = True
-                    continue
+        except Exception as e:
+            safe_print(f"❌ Error initializing Document AI client: {e}")
+            raise
+    
+    async def process_with_document_ai(self, file_bytes: bytes, mime_type: str) -> str:
+        """Extract text from invoice using Document AI OCR"""
+        # Create Document AI request
+        raw_document = documentai.RawDocument(
+            content=file_bytes,
+            mime_type=mime_type
+        )
+        
+        request = documentai.ProcessRequest(
+            name=self.processor_name,
+            raw_document=raw_document
+        )
+        
+        # Process document
+        result = await self.docai_client.process_document(request=request)
+        document = result.document
+        
+        return document.text
+    
+    async def process_with_gemini_vision(
+        self,
+        file_bytes: Optional[bytes],
+        mime_type: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Use Gemini AI to analyze invoice with both image and text
+        """
+        prompt = _PROMPT
+        
+        # Prepare the image
+        if file_bytes:
+            try:
+                # Gemini takes the file as inline data, no need to decode it here
+                # (TIFF conversion is CPU-bound, so this runs in a worker thread)
+                image_part = await asyncio.to_thread(self._gemini_inline_part, file_bytes, mime_type)
                 
-                escape_next = False
+                # Generate response with IMAGE + TEXT
+                response = await self.gemini_model.generate_content_async([prompt, image_part])
                 
-                # Count braces only outside strings
-                if not in_string:
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            # Found complete JSON object
-                            text = text[:i + 1]
-                            break
+            except Exception as e:
+                safe_print(f"Warning: Could not load image, falling back to text-only: {e}")
+                response = await self.gemini_model.generate_content_async(prompt)
+        else:
+            response = await self.gemini_model.generate_content_async(prompt)
+        
+        # Parse JSON from response
+        return self._parse_gemini_response(response.text)
+    
+    @staticmethod
+    def _gemini_inline_part(file_bytes: bytes, mime_type: str) -> Dict[str, Any]:
+        """Wrap file bytes as Gemini inline data, converting only formats Gemini can't read"""
+        if mime_type == 'image/tiff':
+            # TIFF isn't an accepted Gemini image type, so it still goes through PIL as PNG
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.open(io.BytesIO(file_bytes)).save(buffer, format='PNG')
+            return {"mime_type": "image/png", "data": buffer.getvalue()}
+        return {"mime_type": mime_type, "data": file_bytes}
+    
+    def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
+        """Parse JSON from Gemini response with robust error handling"""
+        try:
+            # Remove markdown code blocks if present
+            text = _FENCE_RE.sub('', response_text).strip()
             
-            # If we still have unbalanced braces, try to repair
-            if brace_count != 0:
+            # Decode the first complete JSON object; this ignores any text Gemini adds after it
+            start = max(text.find("{"), 0)
+            try:
+                invoice_data, _ = _JSON_DECODER.raw_decode(text, start)
+            except json.JSONDecodeError:
                 safe_print("⚠ JSON appears truncated, attempting repair...")
+                text = text[start:]
                 # Find last complete item and truncate there
                 last_complete_item = text.rfind('    }')
                 if last_complete_item != -1:
@@ -435,9 +465,8 @@ class InvoiceOCR:
                         text += "]" * (open_brackets - close_brackets)
                     if open_braces > close_braces:
                         text += "}" * (open_braces - close_braces)
-            
-            # Parse JSON
-            invoice_data = json.loads(text)
+                
+                invoice_data = json.loads(text)
             
             # Validate structure
             if not isinstance(invoice_data, dict):
@@ -486,18 +515,7 @@ class InvoiceOCR:
     
     def _detect_mime_type(self, file_path: str) -> str:
         """Detect MIME type from file extension"""
-        extension = Path(file_path).suffix.lower()
-        
-        mime_types = {
-            '.pdf': 'application/pdf',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.tiff': 'image/tiff',
-            '.tif': 'image/tiff'
-        }
-        
-        return mime_types.get(extension, 'application/octet-stream')
+        return _MIME_MAP.get(Path(file_path).suffix.lower(), 'application/octet-stream')
     
     def _validate_and_correct_quantities(self, line_items: list) -> list:
         """
@@ -509,89 +527,102 @@ class InvoiceOCR:
         if not line_items:
             return line_items
         
-        import re
         corrected_items = []
-        corrections_made = 0
+        corrections = []
         
         for item in line_items:
             try:
                 # Clean redundant quantity prefix from description
                 description = item.get('description', '')
-                if description:
+                # Only descriptions starting with a digit can carry a prefix
+                if description and description[:1].isdigit():
                     # Remove patterns like "2x ", "1× ", "3 x ", etc. at the start
-                    cleaned_description = re.sub(r'^(\d+\.?\d*)\s*[x×]\s*', '', description, flags=re.IGNORECASE)
+                    cleaned_description = _QTY_PREFIX_RE.sub('', description)
                     if cleaned_description != description:
                         item['description'] = cleaned_description.strip()
                 
-                quantity = float(item.get('quantity', 0))
-                unit_price = float(item.get('unit_price', 0))
-                total_price = float(item.get('total_price', 0))
-                
-                # Skip if any value is 0 or missing
-                if quantity == 0 or unit_price == 0 or total_price == 0:
-                    corrected_items.append(item)
-                    continue
+                quantity = item.get('quantity', 0)
+                unit_price = item.get('unit_price', 0)
+                total_price = item.get('total_price', 0)
+                # Gemini normally returns JSON numbers; only convert when one came back as a string
+                if not (
+                    isinstance(quantity, (int, float))
+                    and isinstance(unit_price, (int, float))
+                    and isinstance(total_price, (int, float))
+                ):
+                    quantity, unit_price, total_price = float(quantity), float(unit_price), float(total_price)
                 
-                # Calculate expected total
-                expected_total = round(quantity * unit_price, 2)
+                correct_quantity = _corrected_quantity(quantity, unit_price, total_price)
                 
-                # Check if within 2% tolerance
-                tolerance = 0.02 * total_price
-                difference = abs(expected_total - total_price)
-                
-                if difference > tolerance:
-                    # Math is wrong! Recalculate quantity
-                    correct_quantity = round(total_price / unit_price, 2)
-                    
-                    safe_print(f"   ⚠ Correcting quantity for '{item.get('description', 'Unknown')[:40]}':")
-                    safe_print(f"      Old: qty={quantity} × {unit_price} = {expected_total} (expected {total_price})")
-                    safe_print(f"      New: qty={correct_quantity} × {unit_price} = {total_price} ✓")
+                if correct_quantity is not None:
+                    # Logged together after the loop
+                    corrections.append((item.get('description', 'Unknown')[:40], quantity, unit_price, total_price, correct_quantity))
                     
                     # Update the quantity
                     item['quantity'] = correct_quantity
-                    corrections_made += 1
                 
                 corrected_items.append(item)
                 
             except (ValueError, TypeError, ZeroDivisionError) as e:
                 # If there's an error, keep the original item
-                safe_print(f"   ⚠ Could not validate item: {e}")
+                logger.warning("Could not validate item: %s", e)
                 corrected_items.append(item)
         
-        if corrections_made > 0:
-            safe_print(f"   ✓ Corrected {corrections_made} quantity values")
+        if corrections:
+            logger.warning(
+                "Corrected %d quantity values:\n%s",
+                len(corrections),
+                "\n".join(
+                    f"   '{description}': qty={quantity} × {unit_price} = {round(quantity * unit_price, 2)} "
+                    f"(expected {total_price}) -> qty={correct_quantity}"
+                    for description, quantity, unit_price, total_price, correct_quantity in corrections
+                )
+            )
         else:
-            safe_print(f"   ✓ All quantities verified - no corrections needed")
+            logger.debug("All quantities verified - no corrections needed")
         
         return corrected_items
     
-    def process_invoice(
+    async def process_invoice(
         self, 
-        file_path: str, 
+        file_path: Optional[str] = None, 
         output_json_path: Optional[str] = None,
-        save_json: bool = True
+        save_json: bool = True,
+        file_bytes: Optional[bytes] = None,
+        mime_type: Optional[str] = None,
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Complete pipeline: Document AI OCR + Gemini AI interpretation
         
         Args:
-            file_path: Path to invoice image/PDF
+            file_path: Path to invoice image/PDF (not needed when file_bytes is given)
             output_json_path: Optional path to save JSON output
             save_json: Whether to save JSON output (set False for API usage)
+            file_bytes: Invoice content already in memory, e.g. an upload
+            mime_type: MIME type of file_bytes (detected from the name if omitted)
+            filename: Original name of file_bytes, used for logs and the JSON output name
         
         Returns:
             Structured invoice data
         """
-        safe_print(f"Processing invoice: {file_path}")
+        source_name = filename or file_path
+        safe_print(f"Processing invoice: {source_name}")
         
-        # Step 1: Extract text with Document AI
-        safe_print("Step 1: Extracting text with Document AI...")
-        raw_text = self.process_with_document_ai(file_path)
-        safe_print(f"Document AI extracted {len(raw_text)} characters")
+        # Read the file once; both services get the same bytes
+        if file_bytes is None:
+            async with aiofiles.open(file_path, "rb") as file:
+                file_bytes = await file.read()
+        mime_type = mime_type or self._detect_mime_type(source_name)
         
-        # Step 2: Analyze with Gemini AI
-        safe_print("Step 2: Analyzing with Gemini AI for perfect interpretation...")
-        invoice_data = self.process_with_gemini_vision(file_path, raw_text)
+        # Steps 1 + 2: Document AI OCR and Gemini vision run concurrently.
+        # The Gemini prompt never embedded the OCR text, so it doesn't need to wait for it.
+        safe_print("Step 1+2: Extracting text with Document AI and analyzing with Gemini AI...")
+        raw_text, invoice_data = await asyncio.gather(
+            self.process_with_document_ai(file_bytes, mime_type),
+            self.process_with_gemini_vision(file_bytes, mime_type)
+        )
+        safe_print(f"Document AI extracted {len(raw_text)} characters")
         
         # Step 3: Validate and correct quantities (backend safety check)
         if "error" not in invoice_data and "line_items" in invoice_data:
@@ -615,15 +646,14 @@ class InvoiceOCR:
         # Save to JSON if requested
         if save_json:
             if not output_json_path:
-                file_stem = Path(file_path).stem
+                file_stem = Path(source_name).stem
                 if os.path.exists("/app"):
                     output_json_path = f"/tmp/{file_stem}_invoice.json"
                 else:
                     output_json_path = f"{file_stem}_invoice.json"
             
             try:
-                with open(output_json_path, 'w', encoding='utf-8') as f:
-                    json.dump(invoice_data, f, indent=2, ensure_ascii=False)
+                Path(output_json_path).write_bytes(orjson.dumps(invoice_data, option=orjson.OPT_INDENT_2))
                 safe_print(f"✓ Results saved to: {output_json_path}")
             except (PermissionError, OSError) as e:
                 safe_print(f"⚠ Warning: Could not save JSON file: {e}")
@@ -631,7 +661,7 @@ class InvoiceOCR:
         return invoice_data
 
 
-def main():
+async def main():
     """Example usage"""
     import sys
     
@@ -642,6 +672,7 @@ def main():
     input_file = sys.argv[1]
     output_file = sys.argv[2] if len(sys.argv) > 2 else None
     
+    # The async Document AI client binds to the running loop, so it is created inside main()
     # Initialize invoice OCR processor
     ocr = InvoiceOCR(
         project_id=PROJECT_ID,
@@ -651,28 +682,49 @@ def main():
     )
     
     # Process invoice
-    invoice_data = ocr.process_invoice(input_file, output_file)
+    invoice_data = await ocr.process_invoice(input_file, output_file)
     
     # Display results
     safe_print("\n" + "="*70)
     safe_print("INVOICE OCR RESULTS")
     safe_print("="*70)
-    safe_print(json.dumps(invoice_data, indent=2, ensure_ascii=False))
+    safe_print(orjson.dumps(invoice_data, option=orjson.OPT_INDENT_2).decode('utf-8'))
     safe_print("="*70)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
 
 # FastAPI Router
+import hashlib
+from cachetools import TTLCache
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
-import tempfile
-import shutil
+from redis.exceptions import RedisError
+
+from cache import redis_client
 
 router = APIRouter()
 
+BASE_DIR = Path(__file__).resolve().parent.parent  # Backend directory
+UPLOAD_DIR = BASE_DIR / "uploads"
+# Uploads are processed in memory; set OCR_ARCHIVE_UPLOADS=true to also keep the source files
+ARCHIVE_UPLOADS = os.getenv("OCR_ARCHIVE_UPLOADS", "false").lower() == "true"
+
+# Invoices processed at once across all requests, sized to Document AI / Gemini quotas
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "8"))
+_ocr_semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+# Invoices accepted in one /upload/batch request
+MAX_BATCH_FILES = 20
+
+# Re-uploads of the same invoice (retries, reconciliation) reuse the extraction for a week.
+# The in-process fallback holds fewer, shorter-lived entries since each worker keeps its own copy
+INVOICE_CACHE_TTL = 7 * 24 * 3600
+LOCAL_INVOICE_CACHE_TTL = 24 * 3600
+invoice_cache = TTLCache(maxsize=256, ttl=LOCAL_INVOICE_CACHE_TTL)
+invoice_cache_lock = asyncio.Lock()
+
 # Initialize OCR processor (singleton)
 _ocr_processor = None
 
@@ -706,72 +758,149 @@ def get_ocr_processor():
     return _ocr_processor
 
 
+async def archive_upload(filename: str, content: bytes) -> Optional[str]:
+    """Keep a copy of the uploaded source under uploads/ when OCR_ARCHIVE_UPLOADS is enabled"""
+    if not ARCHIVE_UPLOADS:
+        return None
+    
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    # Create safe filename (remove special characters, keep extension)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_filename = f"{timestamp}_{_SAFE_NAME_RE.sub('_', filename)}"
+    file_path = UPLOAD_DIR / safe_filename
+    
+    try:
+        async with aiofiles.open(file_path, "wb") as buffer:
+            await buffer.write(content)
+    except OSError as e:
+        safe_print(f"⚠ Warning: Could not archive upload: {e}")
+        return None
+    
+    safe_print(f"✓ Archived uploaded file: {file_path}")
+    return str(file_path.relative_to(BASE_DIR))
+
+
+def validate_file_type(filename: str):
+    """Reject uploads that aren't an invoice image or PDF"""
+    file_ext = Path(filename).suffix.lower()
+    
+    if file_ext not in _ALLOWED_EXT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type for {filename}. Allowed: {', '.join(_MIME_MAP)}"
+        )
+
+
+def redis_invoice_key(digest: str) -> str:
+    return f"ocr:{digest}"
+
+async def get_cached_invoice(digest: str) -> Optional[Dict[str, Any]]:
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(redis_invoice_key(digest))
+            return orjson.loads(cached) if cached else None
+        except RedisError as e:
+            logger.warning(f"Redis invoice cache unavailable, using local cache: {e}")
+    async with invoice_cache_lock:
+        return invoice_cache.get(digest)
+
+async def set_cached_invoice(digest: str, invoice_data: Dict[str, Any]):
+    if redis_client is not None:
+        try:
+            await redis_client.set(redis_invoice_key(digest), orjson.dumps(invoice_data), ex=INVOICE_CACHE_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis invoice cache unavailable, using local cache: {e}")
+    async with invoice_cache_lock:
+        invoice_cache[digest] = invoice_data
+
+
+async def process_upload(ocr: InvoiceOCR, filename: str, content: bytes, force: bool = False) -> Dict[str, Any]:
+    """Run one in-memory upload through the OCR pipeline, within the shared concurrency limit"""
+    async with _ocr_semaphore:
+        return await extract_upload(ocr, filename, content, force)
+
+
+async def extract_upload(ocr: InvoiceOCR, filename: str, content: bytes, force: bool = False) -> Dict[str, Any]:
+    """
+    Run one in-memory upload through the OCR pipeline; callers hold _ocr_semaphore.
+    Identical content reuses the cached extraction unless force is set.
+    """
+    # hashlib releases the GIL on large inputs, so hashing big PDFs doesn't stall the event loop
+    digest = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+    if not force:
+        cached = await get_cached_invoice(digest)
+        if cached is not None:
+            safe_print(f"✓ Reusing previous extraction for {filename} (identical content)")
+            return cached
+    
+    # Don't save JSON to disk for API usage
+    invoice_data = await ocr.process_invoice(
+        file_bytes=content,
+        mime_type=ocr._detect_mime_type(filename),
+        filename=filename,
+        save_json=False
+    )
+    
+    # Failed extractions are retried on the next upload
+    if "error" not in invoice_data:
+        await set_cached_invoice(digest, invoice_data)
+    return invoice_data
+
+
+def invoice_summary(invoice_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Transform the structured invoice data to frontend format"""
+    items = [
+        {
+            "name": line_item.get("description", "Unknown Item"),
+            "quantity": line_item.get("quantity", 0),
+            "unit": line_item.get("unit", "PZ"),
+            "category": line_item.get("type", "Other"),
+            "price": line_item.get("unit_price", 0),
+            "lot_number": "",  # Can be added manually later
+            "expiry_date": ""  # Can be added manually later
+        }
+        for line_item in invoice_data.get("line_items", ())
+    ]
+    
+    return {
+        "items": items,
+        "supplier": invoice_data.get("supplier", {}).get("name", "Unknown Supplier"),
+        "date": invoice_data.get("invoice_details", {}).get("invoice_date", "")
+    }
+
+
+async def warm_ocr_processor():
+    """Build the OCR processor at boot so the first upload doesn't pay for client setup"""
+    if not all([PROJECT_ID, LOCATION, PROCESSOR_ID, GEMINI_API_KEY]):
+        return
+    try:
+        get_ocr_processor()
+    except Exception as e:
+        # Leave it to the first request to retry and report the error
+        safe_print(f"⚠ Could not initialize OCR processor at startup: {e}")
+
+
 @router.post("/upload")
-async def upload_invoice(file: UploadFile = File(...)):
+async def upload_invoice(file: UploadFile = File(...), force: bool = False):
     """
     Upload and process an invoice image/PDF
     
-    Returns structured invoice data with line items, totals, and supplier information
+    Returns structured invoice data with line items, totals, and supplier information.
+    Pass force=true to reprocess a file whose extraction is already cached.
     """
     try:
-        # Validate file type
-        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.tiff', '.tif'}
-        file_ext = Path(file.filename).suffix.lower()
+        validate_file_type(file.filename)
         
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"
-            )
-        
-        # Create uploads directory if it doesn't exist
-        BASE_DIR = Path(__file__).resolve().parent.parent  # Backend directory
-        UPLOAD_DIR = BASE_DIR / "uploads"
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        
-        # Create safe filename (remove special characters, keep extension)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        # Remove special characters but keep alphanumeric, dots, and hyphens
-        clean_filename = re.sub(r'[^\w\-_.]', '_', file.filename)
-        safe_filename = f"{timestamp}_{clean_filename}"
-        file_path = UPLOAD_DIR / safe_filename
-        
-        safe_print(f"📁 Original filename: {file.filename}")
-        safe_print(f"📁 Safe filename: {safe_filename}")
-        safe_print(f"📁 Full path: {file_path}")
-        
-        # Save uploaded file to uploads folder
-        try:
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Verify file was saved successfully
-            if not file_path.exists():
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"File saving failed - file does not exist at {file_path}"
-                )
-            
-            file_size = file_path.stat().st_size
-            safe_print(f"✓ Saved uploaded file: {file_path} ({file_size} bytes)")
-            
-        except Exception as e:
-            safe_print(f"❌ Error saving file: {e}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to save file: {str(e)}"
-            )
+        content = await file.read()
+        safe_print(f"📁 Received {file.filename} ({len(content)} bytes)")
         
         try:
             # Get OCR processor
             ocr = get_ocr_processor()
             
-            # Process invoice (don't save JSON to disk for API usage)
-            # Use absolute path as string
-            absolute_path = str(file_path.absolute())
-            safe_print(f"🔍 Processing invoice at: {absolute_path}")
-            invoice_data = ocr.process_invoice(absolute_path, save_json=False)
+            # Process the upload straight from memory (don't save JSON to disk for API usage)
+            invoice_data = await process_upload(ocr, file.filename, content, force)
             
             # Check for errors
             if "error" in invoice_data:
@@ -785,44 +914,20 @@ async def upload_invoice(file: UploadFile = File(...)):
                     }
                 )
             
-            # Transform the structured invoice data to frontend format
-            items = []
-            for line_item in invoice_data.get("line_items", []):
-                items.append({
-                    "name": line_item.get("description", "Unknown Item"),
-                    "quantity": line_item.get("quantity", 0),
-                    "unit": line_item.get("unit", "PZ"),
-                    "category": line_item.get("type", "Other"),
-                    "price": line_item.get("unit_price", 0),
-                    "lot_number": "",  # Can be added manually later
-                    "expiry_date": ""  # Can be added manually later
-                })
-            
-            # Extract supplier name
-            supplier_info = invoice_data.get("supplier", {})
-            supplier_name = supplier_info.get("name", "Unknown Supplier")
-            
-            # Extract invoice date
-            invoice_details = invoice_data.get("invoice_details", {})
-            invoice_date = invoice_details.get("invoice_date", "")
-            
             # Return success response in frontend-compatible format
             return JSONResponse(
                 status_code=200,
                 content={
                     "status": "success",
                     "success": True,
-                    "items": items,
-                    "supplier": supplier_name,
-                    "date": invoice_date,
-                    "uploaded_file": str(file_path.relative_to(BASE_DIR)),  # Relative path to saved file
+                    **invoice_summary(invoice_data),
+                    "uploaded_file": await archive_upload(file.filename, content),  # Relative path to saved file, if archived
                     "raw_data": invoice_data  # Include full structured data for debugging
                 }
             )
             
         except Exception as e:
-            # If processing fails, keep the file but log the error
-            safe_print(f"⚠ Error processing invoice (file saved): {e}")
+            safe_print(f"⚠ Error processing invoice: {e}")
             raise
                 
     except HTTPException:
@@ -837,6 +942,62 @@ async def upload_invoice(file: UploadFile = File(...)):
         )
 
 
+@router.post("/upload/batch")
+async def upload_invoice_batch(files: List[UploadFile] = File(...), force: bool = False):
+    """
+    Upload and process several invoice images/PDFs concurrently
+    
+    Returns one result per file; a failed file doesn't fail the rest of the batch
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: {len(files)}. At most {MAX_BATCH_FILES} invoices per batch"
+        )
+    for file in files:
+        validate_file_type(file.filename)
+    
+    ocr = get_ocr_processor()
+    
+    async def process_file(file: UploadFile) -> Dict[str, Any]:
+        # Read inside the limit so only OCR_CONCURRENCY uploads are held in memory at once
+        async with _ocr_semaphore:
+            return await extract_upload(ocr, file.filename, await file.read(), force)
+    
+    results = await asyncio.gather(*(process_file(file) for file in files), return_exceptions=True)
+    
+    invoices = []
+    for file, result in zip(files, results):
+        if isinstance(result, Exception):
+            safe_print(f"⚠ Error processing invoice {file.filename}: {result}")
+            invoices.append({"filename": file.filename, "status": "error", "success": False, "error": str(result)})
+        elif "error" in result:
+            invoices.append({
+                "filename": file.filename,
+                "status": "error",
+                "success": False,
+                "error": result.get("error"),
+                "details": result.get("raw_response", "")[:500]
+            })
+        else:
+            invoices.append({
+                "filename": file.filename,
+                "status": "success",
+                "success": True,
+                **invoice_summary(result),
+                "raw_data": result
+            })
+    
+    succeeded = sum(1 for invoice in invoices if invoice["success"])
+    return {
+        "status": "success" if succeeded == len(invoices) else "partial" if succeeded else "error",
+        "processed": len(invoices),
+        "succeeded": succeeded,
+        "failed": len(invoices) - succeeded,
+        "invoices": invoices
+    }
+
+
 @router.get("/health")
 async def ocr_health_check():
     """Check if OCR service is configured and ready"""
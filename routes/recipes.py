@@ -1,20 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.exc import IntegrityError
+from deps import DBSession
 from models import Recipe
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional, Dict, Any
-import json
 from auth import verify_api_key
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Only the response fields, so rows come back as tuples instead of ORM objects
+RECIPE_LIST = select(Recipe.id, Recipe.name, Recipe.items, Recipe.instructions).order_by(Recipe.id)
+RECIPES_BY_IDS = RECIPE_LIST.where(Recipe.id.in_(bindparam("ids", expanding=True)))
 
 class RecipeItem(BaseModel):
     name: str
@@ -26,6 +24,12 @@ class RecipeCreate(BaseModel):
     items: List[RecipeItem]
     instructions: Optional[str] = ""
 
+# Dumps a whole validated item list in one call, for the JSON column and the response alike
+RECIPE_ITEMS = TypeAdapter(List[RecipeItem])
+
+class RecipeBatchRequest(BaseModel):
+    ids: List[int] = Field(..., max_length=1000)
+
 class RecipeResponse(BaseModel):
     id: int
     name: str
@@ -35,33 +39,52 @@ class RecipeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+def recipe_rows_payload(rows) -> List[Dict[str, Any]]:
+    """RecipeResponse-shaped dicts for RECIPE_LIST rows, serialised without response_model validation"""
+    return [
+        {
+            "id": recipe.id,
+            "name": recipe.name,
+            "items": recipe.items or [],
+            "instructions": recipe.instructions or ""
+        }
+        for recipe in rows
+    ]
+
 @router.get("/recipes", response_model=List[RecipeResponse])
 async def get_recipes(
+    db: DBSession,
     skip: int = Query(0, ge=0, description="Number of recipes to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of recipes to return"),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Query(None, description="Return recipes after this id (keyset pagination, replaces skip)")
 ):
-    """Get all recipes with pagination"""
-    recipes = db.query(Recipe).offset(skip).limit(limit).all()
-    result = []
-    for recipe in recipes:
-        items_data = json.loads(recipe.items) if recipe.items else []
-        result.append({
-            "id": recipe.id,
-            "name": recipe.name,
-            "items": items_data,
-            "instructions": recipe.instructions or ""
-        })
-    return result
+    """
+    Get all recipes with pagination, in id order.
+    The X-Next-After-Id response header holds the after_id for the next page.
+    """
+    if after_id is not None:
+        # Seeks through the primary key index, so deep pages cost the same as the first
+        stmt = RECIPE_LIST.where(Recipe.id > after_id).limit(limit)
+    else:
+        stmt = RECIPE_LIST.offset(skip).limit(limit)
+    
+    payload = recipe_rows_payload(db.execute(stmt))
+    headers = {"X-Next-After-Id": str(payload[-1]["id"])} if len(payload) == limit else None
+    return ORJSONResponse(payload, headers=headers)
+
+@router.post("/recipes/batch", response_model=List[RecipeResponse])
+async def get_recipes_batch(request: RecipeBatchRequest, db: DBSession):
+    """Get several recipes by id in one query; unknown ids are skipped"""
+    return ORJSONResponse(recipe_rows_payload(db.execute(RECIPES_BY_IDS, {"ids": request.ids})))
 
 @router.get("/recipes/{recipe_id}", response_model=RecipeResponse)
-async def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
+async def get_recipe(recipe_id: int, db: DBSession):
     """Get a specific recipe"""
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id).first()
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     
-    items_data = json.loads(recipe.items) if recipe.items else []
+    items_data = recipe.items or []
     return {
         "id": recipe.id,
         "name": recipe.name,
@@ -72,39 +95,35 @@ async def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
 @router.post("/recipes", response_model=RecipeResponse)
 async def create_recipe(
     recipe: RecipeCreate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Create a new recipe"""
-    # Check if recipe name already exists
-    existing_recipe = db.query(Recipe).filter(Recipe.name == recipe.name).first()
-    if existing_recipe:
+    items = RECIPE_ITEMS.dump_python(recipe.items)
+    # INSERT ... RETURNING id: the response is built from the inputs, no reload SELECT.
+    # The unique index on name rejects duplicates, so there is no existence check first
+    try:
+        recipe_id = db.execute(
+            insert(Recipe).values(name=recipe.name, items=items, instructions=recipe.instructions).returning(Recipe.id)
+        ).scalar_one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Recipe with this name already exists")
     
-    items_json = json.dumps([item.dict() for item in recipe.items])
-    db_recipe = Recipe(
-        name=recipe.name,
-        items=items_json,
-        instructions=recipe.instructions
-    )
-    
-    db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
-    
     # Return consistent structure
     return {
-        "id": db_recipe.id,
-        "name": db_recipe.name,
-        "items": [item.dict() for item in recipe.items],
-        "instructions": db_recipe.instructions or ""
+        "id": recipe_id,
+        "name": recipe.name,
+        "items": items,
+        "instructions": recipe.instructions or ""
     }
 
 @router.put("/recipes/{recipe_id}")
 async def update_recipe(
     recipe_id: int, 
     recipe: RecipeCreate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Update a recipe"""
@@ -113,7 +132,8 @@ async def update_recipe(
         raise HTTPException(status_code=404, detail="Recipe not found")
     
     db_recipe.name = recipe.name
-    db_recipe.items = json.dumps([item.dict() for item in recipe.items])
+    items = RECIPE_ITEMS.dump_python(recipe.items)
+    db_recipe.items = items
     db_recipe.instructions = recipe.instructions
     
     db.commit()
@@ -123,14 +143,14 @@ async def update_recipe(
     return {
         "id": db_recipe.id,
         "name": db_recipe.name,
-        "items": [item.dict() for item in recipe.items],
+        "items": items,
         "instructions": db_recipe.instructions or ""
     }
 
 @router.delete("/recipes/{recipe_id}")
 async def delete_recipe(
     recipe_id: int, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Delete a recipe"""
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import insert, select
+from deps import DBSession
 from models import Task
 from schemas import TaskCreate, TaskResponse
 from typing import List
@@ -8,21 +9,19 @@ from auth import verify_api_key
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Only the response fields, so rows come back as tuples instead of ORM objects
+TASK_LIST = select(Task.id, Task.recipe, Task.quantity, Task.assigned_to, Task.status)
+
+TASK_STATUSES = frozenset({"todo", "inprogress", "completed"})
 
 @router.get("/tasks", response_model=List[TaskResponse])
-async def get_tasks(db: Session = Depends(get_db)):
+async def get_tasks(db: DBSession):
     """Get all tasks"""
-    tasks = db.query(Task).all()
-    return tasks
+    # Serialised directly; the rows already have the TaskResponse shape
+    return ORJSONResponse([row._asdict() for row in db.execute(TASK_LIST)])
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(task_id: int, db: DBSession):
     """Get a specific task"""
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
@@ -32,21 +31,20 @@ async def get_task(task_id: int, db: Session = Depends(get_db)):
 @router.post("/tasks", response_model=TaskResponse)
 async def create_task(
     task: TaskCreate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Create a new task"""
-    db_task = Task(**task.dict())
-    db.add(db_task)
+    # INSERT ... RETURNING hands back the stored row, so no refresh SELECT is needed
+    db_task = db.execute(insert(Task).values(**task.model_dump()).returning(Task)).scalar_one()
     db.commit()
-    db.refresh(db_task)
     return db_task
 
 @router.put("/tasks/{task_id}")
 async def update_task(
     task_id: int, 
     task: TaskCreate, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Update a task"""
@@ -65,11 +63,11 @@ async def update_task(
 async def update_task_status(
     task_id: int, 
     status: str, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Update task status"""
-    if status not in ["todo", "inprogress", "completed"]:
+    if status not in TASK_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
     
     db_task = db.query(Task).filter(Task.id == task_id).first()
@@ -84,7 +82,7 @@ async def update_task_status(
 @router.delete("/tasks/{task_id}")
 async def delete_task(
     task_id: int, 
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """Delete a task"""
@@ -4,29 +4,52 @@ Handles recipe search from web sources (TheMealDB) and AI-powered ingredient map
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import json
+from typing import List, Optional, Dict, Any, Tuple
+import asyncio
 import logging
 
-from database import SessionLocal
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from data_version import CURRENT_VERSION
+from deps import DBSession, ORJSONRoute
 from models import Recipe, InventoryItem
 from auth import verify_api_key
 from services.ai_service import get_ai_service
 from services.mealdb_service import get_mealdb_service
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 logger = logging.getLogger(__name__)
 
+# Built once so every search shares the service's pooled HTTP client
+mealdb_service = get_mealdb_service()
+ai_service = get_ai_service()
 
-def get_db():
-    """Database session dependency"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Filtered search results per (query, cuisine); the raw TheMealDB search is cached in the service
+filtered_search_cache = TTLCache(maxsize=1024, ttl=600)
+filtered_search_cache_lock = asyncio.Lock()
+
+INVENTORY_FOR_MAPPING = select(InventoryItem.name, InventoryItem.unit, InventoryItem.quantity)
+
+# Inventory as sent to the AI mapper, tagged with the data version it was read at.
+# Every inventory write bumps that version, so the snapshot is reused until the next change
+_inventory_snapshot: Tuple[Optional[int], List[Dict[str, Any]]] = (None, [])
+
+
+def get_inventory_for_mapping(db) -> List[Dict[str, Any]]:
+    """Return the inventory list for ingredient mapping, reloading it only after a write"""
+    global _inventory_snapshot
+    version = db.scalar(CURRENT_VERSION)
+    cached_version, inventory_list = _inventory_snapshot
+    if version is None or version != cached_version:
+        inventory_list = [
+            {"name": row.name, "unit": row.unit, "quantity": row.quantity}
+            for row in db.execute(INVENTORY_FOR_MAPPING)
+        ]
+        _inventory_snapshot = (version, inventory_list)
+    return inventory_list
 
 
 # ============================================================================
@@ -172,6 +195,10 @@ class SaveWebRecipeRequest(BaseModel):
 # ENDPOINTS
 # ============================================================================
 
+async def close_mealdb_client():
+    await mealdb_service.aclose()
+
+
 @router.post("/interpret_query", response_model=InterpretQueryResponse)
 async def interpret_query(request: InterpretQueryRequest):
     """
@@ -182,7 +209,6 @@ async def interpret_query(request: InterpretQueryRequest):
     {"keywords": ["pasta"], "cuisine": "Italian", "restrictions": ["no cheese"]}
     """
     try:
-        ai_service = get_ai_service()
         result = await ai_service.interpret_query(request.query)
         return InterpretQueryResponse(**result)
         
@@ -203,8 +229,12 @@ async def search_recipes(request: SearchRecipesRequest):
     Returns array of recipes with full details including ingredients.
     """
     try:
-        mealdb_service = get_mealdb_service()
-        
+        cache_key = (request.query.lower(), request.cuisine or "")
+        async with filtered_search_cache_lock:
+            cached = filtered_search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # Primary search by query/keywords
         recipes = await mealdb_service.search_by_name(request.query)
         
@@ -212,10 +242,7 @@ async def search_recipes(request: SearchRecipesRequest):
         if request.cuisine:
             # Filter by cuisine (case-insensitive)
             cuisine_lower = request.cuisine.lower()
-            recipes = [
-                r for r in recipes 
-                if r.get("area") and cuisine_lower in r["area"].lower()
-            ]
+            recipes = [r for r in recipes if cuisine_lower in r.get("_area_lower", "")]
         
         # Note: TheMealDB doesn't have cooking time or dietary restrictions
         # in the free API, so we can't filter by those directly
@@ -224,10 +251,10 @@ async def search_recipes(request: SearchRecipesRequest):
         if not recipes:
             return []
         
-        # Convert to response model
-        response_recipes = []
-        for recipe in recipes:
-            response_recipes.append(WebRecipeResponse(
+        # Convert to response model; the service already shapes these fields and
+        # FastAPI validates the returned list against response_model, so skip the first pass
+        response_recipes = [
+            WebRecipeResponse.model_construct(
                 id=recipe["id"],
                 name=recipe["name"],
                 image=recipe.get("image"),
@@ -235,12 +262,16 @@ async def search_recipes(request: SearchRecipesRequest):
                 area=recipe.get("area"),
                 instructions=recipe["instructions"],
                 ingredients=[
-                    RecipeIngredient(name=ing["name"], measure=ing["measure"])
+                    RecipeIngredient.model_construct(name=ing["name"], measure=ing["measure"])
                     for ing in recipe["ingredients"]
                 ],
                 source_url=recipe["source_url"]
-            ))
+            )
+            for recipe in recipes
+        ]
         
+        async with filtered_search_cache_lock:
+            filtered_search_cache[cache_key] = response_recipes
         return response_recipes
         
     except Exception as e:
@@ -254,7 +285,7 @@ async def search_recipes(request: SearchRecipesRequest):
 @router.post("/map_ingredients", response_model=MapIngredientsResponse)
 async def map_ingredients(
     request: MapIngredientsRequest,
-    db: Session = Depends(get_db)
+    db: DBSession
 ):
     """
     Endpoint 3: Map recipe ingredients to inventory using GPT-o3 reasoning
@@ -264,11 +295,7 @@ async def map_ingredients(
     """
     try:
         # Get all inventory items
-        inventory_items = db.query(InventoryItem).all()
-        inventory_list = [
-            {"name": item.name, "unit": item.unit, "quantity": item.quantity}
-            for item in inventory_items
-        ]
+        inventory_list = get_inventory_for_mapping(db)
         
         if not inventory_list:
             # No inventory to map against
@@ -290,7 +317,6 @@ async def map_ingredients(
             )
         
         # Use AI service to perform semantic matching
-        ai_service = get_ai_service()
         mappings = await ai_service.map_ingredients(
             request.recipe_ingredients,
             inventory_list
@@ -317,7 +343,7 @@ async def map_ingredients(
 @router.post("/save_recipe")
 async def save_web_recipe(
     request: SaveWebRecipeRequest,
-    db: Session = Depends(get_db),
+    db: DBSession,
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -327,17 +353,6 @@ async def save_web_recipe(
     Links to user/restaurant and stores web metadata (source URL, image, etc.)
     """
     try:
-        # Check if recipe name already exists
-        existing_recipe = db.query(Recipe).filter(
-            Recipe.name == request.name
-        ).first()
-        
-        if existing_recipe:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Recipe '{request.name}' already exists in your catalogue"
-            )
-        
         # Convert mapped ingredients to the format used by existing recipes
         # Format: [{"name": "...", "qty": ..., "unit": "..."}]
         items_for_recipe = []
@@ -352,18 +367,25 @@ async def save_web_recipe(
         # Create new recipe
         new_recipe = Recipe(
             name=request.name,
-            items=json.dumps(items_for_recipe),
+            items=items_for_recipe,
             instructions=request.instructions,
             source_url=request.source_url,
             image_url=request.image_url,
             cuisine=request.cuisine,
-            ingredients_raw=json.dumps(request.ingredients_raw),
-            ingredients_mapped=json.dumps(request.ingredients_mapped)
+            ingredients_raw=request.ingredients_raw,
+            ingredients_mapped=request.ingredients_mapped
         )
         
         db.add(new_recipe)
-        db.commit()
-        db.refresh(new_recipe)
+        try:
+            db.commit()
+        except IntegrityError:
+            # The unique index on name rejects duplicates, so there is no existence check first
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Recipe '{request.name}' already exists in your catalogue"
+            )
         
         return {
             "success": True,
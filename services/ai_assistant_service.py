@@ -5,13 +5,57 @@ Handles intent detection, conversational AI, and action orchestration
 
 import os
 import json
+import asyncio
+import hashlib
 import logging
 from typing import Dict, Any, List, Optional
+import orjson
+from cachetools import TTLCache
 from openai import OpenAI
 from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from cache import redis_client
 
 logger = logging.getLogger(__name__)
 
+# Staff repeat the same commands, so read-only intents and recipe parses are reused for an hour
+ASSISTANT_CACHE_TTL = 3600
+# Only intents whose handlers ask before writing anything; entities are re-read against the database each time
+CACHEABLE_INTENTS = frozenset({"query_inventory", "show_recipe", "search_recipe_web", "show_catalogue", "filter_catalogue"})
+MIN_CACHED_CONFIDENCE = 0.8
+# Values are stored as orjson bytes so callers can mutate what they get back
+assistant_cache = TTLCache(maxsize=4096, ttl=ASSISTANT_CACHE_TTL)
+assistant_cache_lock = asyncio.Lock()
+
+
+def redis_assistant_key(kind: str, normalized: str) -> str:
+    return f"ai:{kind}:{hashlib.sha1(normalized.encode('utf-8')).hexdigest()}"
+
+
+async def get_cached_reply(kind: str, normalized: str) -> Optional[dict]:
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(redis_assistant_key(kind, normalized))
+            return orjson.loads(cached) if cached else None
+        except RedisError as e:
+            logger.warning(f"Redis assistant cache unavailable, using local cache: {e}")
+    async with assistant_cache_lock:
+        cached = assistant_cache.get((kind, normalized))
+    return orjson.loads(cached) if cached else None
+
+
+async def set_cached_reply(kind: str, normalized: str, reply: dict):
+    encoded = orjson.dumps(reply)
+    if redis_client is not None:
+        try:
+            await redis_client.set(redis_assistant_key(kind, normalized), encoded, ex=ASSISTANT_CACHE_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis assistant cache unavailable, using local cache: {e}")
+    async with assistant_cache_lock:
+        assistant_cache[(kind, normalized)] = encoded
+
 
 class IntentResult(BaseModel):
     """Structure for intent detection result"""
@@ -70,6 +114,13 @@ class AIAssistantService:
         Returns:
             IntentResult with detected intent and extracted entities
         """
+        # Context changes the answer, so only standalone commands are cached
+        normalized = None if context else " ".join(user_input.lower().split())
+        if normalized:
+            cached = await get_cached_reply("intent", normalized)
+            if cached is not None:
+                return IntentResult(**cached)
+
         try:
             system_prompt = self._build_intent_detection_prompt()
             
@@ -113,8 +164,13 @@ IMPORTANT: Return ONLY the JSON, no markdown formatting."""
                 result_text = '\n'.join([l for l in lines if not l.startswith("```")])
             
             result_dict = json.loads(result_text)
+            intent_result = IntentResult(**result_dict)
             
-            return IntentResult(**result_dict)
+            if (normalized and intent_result.intent in CACHEABLE_INTENTS
+                    and intent_result.confidence > MIN_CACHED_CONFIDENCE):
+                await set_cached_reply("intent", normalized, intent_result.model_dump())
+            
+            return intent_result
             
         except Exception as e:
             logger.error(f"Intent detection error: {str(e)}")
@@ -141,6 +197,12 @@ IMPORTANT: Return ONLY the JSON, no markdown formatting."""
                 "yield_unit": "piece"
             }
         """
+        # Case is kept because the parsed recipe name is saved as typed
+        normalized = " ".join(user_input.split())
+        cached = await get_cached_reply("recipe", normalized)
+        if cached is not None:
+            return cached
+
         try:
             prompt = f"""You are a recipe parsing expert. Extract ALL ingredient information from this command.
 
@@ -199,6 +261,7 @@ Return ONLY valid JSON, no markdown, no explanation:
                 if ing.get('unit') is None:
                     ing['unit'] = None
             
+            await set_cached_reply("recipe", normalized, parsed)
             return parsed
             
         except Exception as e:
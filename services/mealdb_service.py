@@ -4,12 +4,50 @@ Provides recipe search functionality using TheMealDB public API
 API Documentation: https://www.themealdb.com/api.php
 """
 
+import asyncio
 import httpx
+import orjson
 from typing import List, Dict, Any, Optional
 import logging
 
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from cache import redis_client
+
 logger = logging.getLogger(__name__)
 
+# TheMealDB content rarely changes, so name searches are reused for a while
+SEARCH_CACHE_TTL = 600
+search_cache = TTLCache(maxsize=1024, ttl=SEARCH_CACHE_TTL)
+search_cache_lock = asyncio.Lock()
+
+
+def redis_search_key(query: str) -> str:
+    return f"mealdb:s:{query}"
+
+
+async def get_cached_search(query: str) -> Optional[List[Dict[str, Any]]]:
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(redis_search_key(query))
+            return orjson.loads(cached) if cached else None
+        except RedisError as e:
+            logger.warning(f"Redis search cache unavailable, using local cache: {e}")
+    async with search_cache_lock:
+        return search_cache.get(query)
+
+
+async def set_cached_search(query: str, recipes: List[Dict[str, Any]]):
+    if redis_client is not None:
+        try:
+            await redis_client.set(redis_search_key(query), orjson.dumps(recipes), ex=SEARCH_CACHE_TTL)
+            return
+        except RedisError as e:
+            logger.warning(f"Redis search cache unavailable, using local cache: {e}")
+    async with search_cache_lock:
+        search_cache[query] = recipes
+
 
 class MealDBService:
     """Service for interacting with TheMealDB API"""
@@ -17,8 +55,16 @@ class MealDBService:
     BASE_URL = "https://www.themealdb.com/api/json/v1/1"
     
     def __init__(self):
-        """Initialize MealDB service"""
+        """Initialize MealDB service with a pooled HTTP client reused across requests"""
         self.base_url = self.BASE_URL
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=10.0,
+        )
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        await self.http_client.aclose()
     
     async def search_by_name(self, query: str) -> List[Dict[str, Any]]:
         """
@@ -40,54 +86,69 @@ class MealDBService:
                 "source_url": str
             }]
         """
+        # TheMealDB matches names case-insensitively
+        key = query.strip().lower()
+        recipes = await get_cached_search(key)
+        if recipes is not None:
+            return recipes
+        recipes = await self._fetch_by_name(query)
+        # Failed requests return None and are retried on the next search
+        if recipes is None:
+            return []
+        await set_cached_search(key, recipes)
+        return recipes
+
+    async def _fetch_by_name(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Query TheMealDB search endpoint, returning None on failure"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/search.php",
-                    params={"s": query}
-                )
-                response.raise_for_status()
-                data = response.json()
+            response = await self.http_client.get(
+                f"{self.base_url}/search.php",
+                params={"s": query}
+            )
+            response.raise_for_status()
+            data = response.json()
                 
-                if not data.get("meals"):
-                    return []
+            if not data.get("meals"):
+                return []
                 
-                # Parse and structure the recipes
-                recipes = []
-                for meal in data["meals"]:
-                    # Extract ingredients and measures (TheMealDB has 20 ingredient slots)
-                    ingredients = []
-                    for i in range(1, 21):
-                        ingredient_name = meal.get(f"strIngredient{i}", "")
-                        ingredient_measure = meal.get(f"strMeasure{i}", "")
+            # Parse and structure the recipes
+            recipes = []
+            for meal in data["meals"]:
+                # Extract ingredients and measures (TheMealDB has 20 ingredient slots)
+                ingredients = []
+                for i in range(1, 21):
+                    ingredient_name = meal.get(f"strIngredient{i}", "")
+                    ingredient_measure = meal.get(f"strMeasure{i}", "")
                         
-                        if ingredient_name and ingredient_name.strip():
-                            ingredients.append({
-                                "name": ingredient_name.strip(),
-                                "measure": ingredient_measure.strip() if ingredient_measure else ""
-                            })
+                    if ingredient_name and ingredient_name.strip():
+                        ingredients.append({
+                            "name": ingredient_name.strip(),
+                            "measure": ingredient_measure.strip() if ingredient_measure else ""
+                        })
                     
-                    recipe = {
-                        "id": meal.get("idMeal"),
-                        "name": meal.get("strMeal"),
-                        "image": meal.get("strMealThumb"),
-                        "category": meal.get("strCategory"),
-                        "area": meal.get("strArea"),  # Cuisine type
-                        "instructions": meal.get("strInstructions", ""),
-                        "ingredients": ingredients,
-                        "source_url": meal.get("strSource") or meal.get("strYoutube") or "",
-                        "tags": meal.get("strTags", "").split(",") if meal.get("strTags") else []
-                    }
-                    recipes.append(recipe)
+                recipe = {
+                    "id": meal.get("idMeal"),
+                    "name": meal.get("strMeal"),
+                    "image": meal.get("strMealThumb"),
+                    "category": meal.get("strCategory"),
+                    "area": meal.get("strArea"),  # Cuisine type
+                    # Lowercased once here so cuisine filters compare without re-lowering
+                    "_area_lower": (meal.get("strArea") or "").lower(),
+                    "instructions": meal.get("strInstructions", ""),
+                    "ingredients": ingredients,
+                    "source_url": meal.get("strSource") or meal.get("strYoutube") or "",
+                    "tags": meal.get("strTags", "").split(",") if meal.get("strTags") else []
+                }
+                recipes.append(recipe)
                 
-                return recipes
+            return recipes
                 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error searching TheMealDB: {str(e)}")
-            return []
+            return None
         except Exception as e:
             logger.error(f"Error searching TheMealDB: {str(e)}")
-            return []
+            return None
     
     async def search_by_ingredient(self, ingredient: str) -> List[Dict[str, Any]]:
         """
@@ -100,33 +161,32 @@ class MealDBService:
             List of simplified recipe info (less detail than search_by_name)
         """
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/filter.php",
-                    params={"i": ingredient}
-                )
-                response.raise_for_status()
-                data = response.json()
+            response = await self.http_client.get(
+                f"{self.base_url}/filter.php",
+                params={"i": ingredient}
+            )
+            response.raise_for_status()
+            data = response.json()
                 
-                if not data.get("meals"):
-                    return []
+            if not data.get("meals"):
+                return []
                 
-                # This endpoint returns limited info, so we'll return basic structure
-                recipes = []
-                for meal in data["meals"]:
-                    recipe = {
-                        "id": meal.get("idMeal"),
-                        "name": meal.get("strMeal"),
-                        "image": meal.get("strMealThumb"),
-                        "category": None,
-                        "area": None,
-                        "instructions": None,
-                        "ingredients": [],
-                        "source_url": ""
-                    }
-                    recipes.append(recipe)
+            # This endpoint returns limited info, so we'll return basic structure
+            recipes = []
+            for meal in data["meals"]:
+                recipe = {
+                    "id": meal.get("idMeal"),
+                    "name": meal.get("strMeal"),
+                    "image": meal.get("strMealThumb"),
+                    "category": None,
+                    "area": None,
+                    "instructions": None,
+                    "ingredients": [],
+                    "source_url": ""
+                }
+                recipes.append(recipe)
                 
-                return recipes
+            return recipes
                 
         except Exception as e:
             logger.error(f"Error searching by ingredient: {str(e)}")
@@ -143,44 +203,43 @@ class MealDBService:
             Full recipe dictionary or None if not found
         """
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/lookup.php",
-                    params={"i": meal_id}
-                )
-                response.raise_for_status()
-                data = response.json()
+            response = await self.http_client.get(
+                f"{self.base_url}/lookup.php",
+                params={"i": meal_id}
+            )
+            response.raise_for_status()
+            data = response.json()
                 
-                if not data.get("meals") or len(data["meals"]) == 0:
-                    return None
+            if not data.get("meals") or len(data["meals"]) == 0:
+                return None
                 
-                meal = data["meals"][0]
+            meal = data["meals"][0]
                 
-                # Extract ingredients
-                ingredients = []
-                for i in range(1, 21):
-                    ingredient_name = meal.get(f"strIngredient{i}", "")
-                    ingredient_measure = meal.get(f"strMeasure{i}", "")
+            # Extract ingredients
+            ingredients = []
+            for i in range(1, 21):
+                ingredient_name = meal.get(f"strIngredient{i}", "")
+                ingredient_measure = meal.get(f"strMeasure{i}", "")
                     
-                    if ingredient_name and ingredient_name.strip():
-                        ingredients.append({
-                            "name": ingredient_name.strip(),
-                            "measure": ingredient_measure.strip() if ingredient_measure else ""
-                        })
+                if ingredient_name and ingredient_name.strip():
+                    ingredients.append({
+                        "name": ingredient_name.strip(),
+                        "measure": ingredient_measure.strip() if ingredient_measure else ""
+                    })
                 
-                recipe = {
-                    "id": meal.get("idMeal"),
-                    "name": meal.get("strMeal"),
-                    "image": meal.get("strMealThumb"),
-                    "category": meal.get("strCategory"),
-                    "area": meal.get("strArea"),
-                    "instructions": meal.get("strInstructions", ""),
-                    "ingredients": ingredients,
-                    "source_url": meal.get("strSource") or meal.get("strYoutube") or "",
-                    "tags": meal.get("strTags", "").split(",") if meal.get("strTags") else []
-                }
+            recipe = {
+                "id": meal.get("idMeal"),
+                "name": meal.get("strMeal"),
+                "image": meal.get("strMealThumb"),
+                "category": meal.get("strCategory"),
+                "area": meal.get("strArea"),
+                "instructions": meal.get("strInstructions", ""),
+                "ingredients": ingredients,
+                "source_url": meal.get("strSource") or meal.get("strYoutube") or "",
+                "tags": meal.get("strTags", "").split(",") if meal.get("strTags") else []
+            }
                 
-                return recipe
+            return recipe
                 
         except Exception as e:
             logger.error(f"Error fetching recipe by ID: {str(e)}")
@@ -0,0 +1,37 @@
+"""
+Tests for the /data stream encoders
+Run with: python -m pytest test_data.py
+"""
+
+from types import SimpleNamespace
+
+import orjson
+
+from routes.data import recipe_json
+
+
+def recipe_row(items, yield_data=None):
+    return SimpleNamespace(name="Stew", items=items, yield_data=yield_data)
+
+
+def decode_recipe(encoded: bytes) -> dict:
+    return orjson.loads(b"{" + encoded + b"}")
+
+
+def test_recipe_json_embeds_stored_text():
+    row = recipe_row('[{"name":"beef","qty":1,"unit":"kg"}]', '{"qty":4,"unit":"pz"}')
+    assert decode_recipe(recipe_json(row)) == {
+        "Stew": {"items": [{"name": "beef", "qty": 1, "unit": "kg"}], "yield": {"qty": 4, "unit": "pz"}}
+    }
+
+
+def test_recipe_json_encodes_decoded_json():
+    # The PostgreSQL drivers hand JSONB back as Python objects unless it is cast to text
+    row = recipe_row([{"name": "beef", "qty": 1, "unit": "kg"}])
+    assert decode_recipe(recipe_json(row)) == {
+        "Stew": {"items": [{"name": "beef", "qty": 1, "unit": "kg"}], "yield": None}
+    }
+
+
+def test_recipe_json_empty_items():
+    assert decode_recipe(recipe_json(recipe_row(None))) == {"Stew": {"items": [], "yield": None}}
@@ -170,7 +170,7 @@ def test_database():
         
         if missing_columns:
             print(f"   [WARNING] Missing columns: {', '.join(missing_columns)}")
-            print("   Run migration: python migrate_add_web_recipe_fields.py")
+            print("   Run migration: python migrate.py")
             return False
         
         print("   [OK] All required columns exist")